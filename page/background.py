@@ -0,0 +1,22 @@
+"""
+Background Tasks
+Shared bounded thread pool for work that must not delay a UI call.
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+BACKGROUND_WORKERS = 4
+
+_background_pool = ThreadPoolExecutor(max_workers=BACKGROUND_WORKERS, thread_name_prefix='khaan-bg')
+
+
+def submit_background(func: Callable, *args, **kwargs) -> Future:
+    """Run func on the background pool, logging (not raising) its errors"""
+    def run():
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            print(f"Background task {getattr(func, '__name__', func)} failed: {e}")
+            return None
+    return _background_pool.submit(run)
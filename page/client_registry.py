@@ -0,0 +1,172 @@
+"""
+MongoDB Client Registry
+Keep one pooled MongoClient per connection for the life of the app.
+"""
+
+import atexit
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+from pymongo import MongoClient
+
+
+# Defaults passed to every MongoClient; per-connection values in config.json override them
+DEFAULT_POOL_OPTIONS = {
+    'maxPoolSize': 20,
+    'minPoolSize': 0,
+    'maxIdleTimeMS': 300000,
+    'serverSelectionTimeoutMS': 5000,
+}
+
+# config.json connection keys -> MongoClient option names
+POOL_CONFIG_KEYS = {
+    'max_pool_size': 'maxPoolSize',
+    'min_pool_size': 'minPoolSize',
+    'max_idle_time_ms': 'maxIdleTimeMS',
+}
+
+# Close a client that has not been used for this many seconds
+DEFAULT_IDLE_TIMEOUT = 900
+REAPER_INTERVAL = 60
+
+
+class MongoClientRegistry:
+    """Process-wide registry of pooled MongoClient instances keyed by connection name"""
+
+    def __init__(self, idle_timeout: float = DEFAULT_IDLE_TIMEOUT, pool_options: Optional[Dict] = None):
+        self.idle_timeout = idle_timeout
+        self.pool_options = dict(DEFAULT_POOL_OPTIONS)
+        if pool_options:
+            self.pool_options.update(pool_options)
+        self._entries: Dict[str, Dict] = {}
+        # Pins per connection name, kept apart from the entries so a pin taken while no client
+        # exists (e.g. just after an eviction) protects the client created next
+        self._pins: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+
+    def get_client(self, connection: Dict, connection_string: str) -> MongoClient:
+        """Return the pooled client for a connection, creating it on first use"""
+        name = connection['name']
+        options = self._client_options(connection)
+        fingerprint = self._fingerprint(connection_string, options)
+        stale = None
+
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry and entry['fingerprint'] != fingerprint:
+                # Connection settings changed since the client was created
+                stale = self._entries.pop(name)
+                entry = None
+            if entry is None:
+                entry = {
+                    'client': MongoClient(connection_string, **options),
+                    'fingerprint': fingerprint,
+                    'last_used': time.monotonic(),
+                }
+                self._entries[name] = entry
+            entry['last_used'] = time.monotonic()
+            client = entry['client']
+
+        if stale:
+            self._close(stale)
+        self._ensure_reaper()
+        return client
+
+    def invalidate(self, name: str):
+        """Close and forget the client of a connection (after edit or remove)"""
+        with self._lock:
+            entry = self._entries.pop(name, None)
+        if entry:
+            self._close(entry)
+
+    def pin(self, name: str) -> Callable[[], None]:
+        """
+        Keep a connection's client from idle eviction until the returned release function is
+        called, for things that outlive one call (e.g. a cursor session); releasing twice is harmless
+        """
+        with self._lock:
+            self._pins[name] = self._pins.get(name, 0) + 1
+        released = []
+
+        def release():
+            with self._lock:
+                if released:
+                    return
+                released.append(True)
+                self._pins[name] -= 1
+                if not self._pins[name]:
+                    del self._pins[name]
+                # The idle timeout counts from the end of the work, not its start
+                entry = self._entries.get(name)
+                if entry:
+                    entry['last_used'] = time.monotonic()
+        return release
+
+    @contextmanager
+    def in_use(self, name: str):
+        """Keep a connection's client from idle eviction while a long operation (e.g. an index build) runs"""
+        release = self.pin(name)
+        try:
+            yield
+        finally:
+            release()
+
+    def evict_idle(self):
+        """Close clients that have been idle longer than idle_timeout and are not pinned"""
+        now = time.monotonic()
+        with self._lock:
+            idle = [name for name, entry in self._entries.items()
+                    if now - entry['last_used'] > self.idle_timeout and not self._pins.get(name)]
+            evicted = [self._entries.pop(name) for name in idle]
+        for entry in evicted:
+            self._close(entry)
+
+    def close_all(self):
+        """Close every pooled client"""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            self._close(entry)
+
+    def _client_options(self, connection: Dict) -> Dict:
+        """Merge registry defaults with per-connection pool settings"""
+        options = dict(self.pool_options)
+        for config_key, option_name in POOL_CONFIG_KEYS.items():
+            value = connection.get(config_key)
+            if value not in (None, ''):
+                options[option_name] = int(value)
+        return options
+
+    def _fingerprint(self, connection_string: str, options: Dict) -> str:
+        """Hash of everything that requires a new client when it changes"""
+        raw = connection_string + repr(sorted(options.items()))
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _close(self, entry: Dict):
+        try:
+            entry['client'].close()
+        except Exception as e:
+            print(f"Error closing client: {e}")
+
+    def _ensure_reaper(self):
+        """Start the idle-eviction thread once"""
+        if self._reaper and self._reaper.is_alive():
+            return
+        with self._lock:
+            if self._reaper and self._reaper.is_alive():
+                return
+            self._reaper = threading.Thread(target=self._reap_loop, name='mongo-client-reaper', daemon=True)
+            self._reaper.start()
+
+    def _reap_loop(self):
+        while True:
+            time.sleep(REAPER_INTERVAL)
+            self.evict_idle()
+
+
+client_registry = MongoClientRegistry()
+atexit.register(client_registry.close_all)
@@ -0,0 +1,142 @@
+"""
+Collection Stats
+Reduce $collStats / collStats output to the sizes and latencies shown in the collection views.
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+
+# Collections whose stats are read at the same time, across all open listings
+STATS_WORKERS = 8
+# Batches nobody polls any more are forgotten after this long (seconds)
+BATCH_RETENTION = 300
+COLL_STATS_STAGE = {'$collStats': {'storageStats': {}, 'latencyStats': {'histograms': False}}}
+LATENCY_KINDS = ('reads', 'writes', 'commands')
+
+
+def _empty_summary() -> Dict:
+    return {
+        'count': 0,
+        'size': 0,
+        'storage_size': 0,
+        'total_index_size': 0,
+        'index_sizes': {},
+        'nindexes': 0,
+        'capped': False,
+        'shards': 0,
+        'latency': {kind: {'ops': 0, 'latency_us': 0} for kind in LATENCY_KINDS},
+    }
+
+
+def _add_storage(summary: Dict, storage: Dict):
+    summary['count'] += int(storage.get('count', 0))
+    summary['size'] += int(storage.get('size', 0))
+    summary['storage_size'] += int(storage.get('storageSize', 0))
+    summary['total_index_size'] += int(storage.get('totalIndexSize', 0))
+    for name, size in storage.get('indexSizes', {}).items():
+        summary['index_sizes'][name] = summary['index_sizes'].get(name, 0) + int(size)
+    summary['nindexes'] = max(summary['nindexes'], int(storage.get('nindexes', 0)))
+    summary['capped'] = summary['capped'] or bool(storage.get('capped'))
+
+
+def summarize_coll_stats(stats_documents: Iterable[Dict]) -> Dict:
+    """
+    Sum the $collStats documents of a collection (one per shard when sharded) into
+    count / size / storage / index sizes and per-operation latency totals. avg_obj_size
+    and avg latency are derived from the sums, as averages cannot be added across shards.
+    """
+    summary = _empty_summary()
+    for stats in stats_documents:
+        summary['shards'] += 1
+        _add_storage(summary, stats.get('storageStats', {}))
+        latency = stats.get('latencyStats', {})
+        for kind in LATENCY_KINDS:
+            entry = latency.get(kind, {})
+            summary['latency'][kind]['ops'] += int(entry.get('ops', 0))
+            summary['latency'][kind]['latency_us'] += int(entry.get('latency', 0))
+    return _finish(summary)
+
+
+def summarize_coll_stats_command(output: Dict) -> Dict:
+    """Same summary from the collStats command (servers or views without $collStats); no latencies"""
+    summary = _empty_summary()
+    summary['shards'] = len(output.get('shards', {})) or 1
+    _add_storage(summary, output)
+    result = _finish(summary)
+    result['latency'] = None
+    return result
+
+
+def _finish(summary: Dict) -> Dict:
+    summary['avg_obj_size'] = summary['size'] // summary['count'] if summary['count'] else 0
+    for entry in summary['latency'].values():
+        entry['avg_us'] = entry['latency_us'] // entry['ops'] if entry['ops'] else None
+    return summary
+
+
+class StatsBatches:
+    """
+    Read the stats of many collections concurrently on one bounded pool. A batch collects
+    results as they finish; each poll hands over what arrived since the previous one, so
+    the collections table can fill its rows progressively.
+    """
+
+    def __init__(self, max_workers: int = STATS_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='khaan-stats')
+        self._batches: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def start(self, names: List[str], read: Callable[[str], Dict]) -> str:
+        """Queue read(name) for every name and return the batch id"""
+        self._prune()
+        batch_id = uuid.uuid4().hex
+        with self._lock:
+            self._batches[batch_id] = {'ready': {}, 'remaining': len(names), 'touched': time.time()}
+        for name in names:
+            self._executor.submit(self._read, batch_id, name, read)
+        return batch_id
+
+    def _read(self, batch_id: str, name: str, read: Callable[[str], Dict]):
+        with self._lock:
+            if batch_id not in self._batches:
+                # Cancelled: the listing moved on to another page or filter
+                return
+        try:
+            stats = read(name)
+        except Exception as e:
+            stats = {'error': str(e)}
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            if batch:
+                batch['ready'][name] = stats
+                batch['remaining'] -= 1
+
+    def poll(self, batch_id: str) -> Optional[Dict]:
+        """Results that arrived since the last poll, and whether the batch is complete"""
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            if batch is None:
+                return None
+            ready, batch['ready'] = batch['ready'], {}
+            batch['touched'] = time.time()
+            done = batch['remaining'] <= 0
+            if done:
+                del self._batches[batch_id]
+        return {'stats': ready, 'done': done}
+
+    def cancel(self, batch_id: str):
+        """Skip the batch's reads that have not started yet"""
+        with self._lock:
+            self._batches.pop(batch_id, None)
+
+    def _prune(self):
+        cutoff = time.time() - BATCH_RETENTION
+        with self._lock:
+            for batch_id in [b for b, batch in self._batches.items() if batch['touched'] < cutoff]:
+                del self._batches[batch_id]
+
+
+stats_batches = StatsBatches()
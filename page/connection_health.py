@@ -0,0 +1,100 @@
+"""
+Connection Health
+Remember the last round-trip result per connection so operations can skip the ping.
+"""
+
+import threading
+import time
+import weakref
+from typing import Dict
+from pymongo import MongoClient
+
+from background import submit_background
+
+
+# A successful ping is trusted without re-checking for this many seconds
+HEALTH_TTL = 30
+# After HEALTH_TTL a healthy connection is still used while a background ping re-checks it,
+# up to this age; older results are re-checked in the foreground
+HEALTH_MAX_STALE = 300
+
+
+class ConnectionHealth:
+    """Cache of ping results per connection with background re-checks"""
+
+    def __init__(self, ttl: float = HEALTH_TTL, max_stale: float = HEALTH_MAX_STALE):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._states: Dict[str, Dict] = {}
+        self._rechecking = set()
+        self._lock = threading.Lock()
+
+    def check(self, name: str, client: MongoClient, force: bool = False) -> Dict:
+        """
+        Return {'ok': bool, 'message': str} for a connection:
+        - fresh success: no ping
+        - stale success: ok now, ping again in the background
+        - known unreachable: fail immediately, ping again in the background
+        - unknown or forced: ping now
+        """
+        if not force:
+            state = self._state_for(name, client)
+            if state:
+                age = time.monotonic() - state['checked_at']
+                if state['ok'] and age < self.ttl:
+                    return {'ok': True, 'message': 'Connected'}
+                if state['ok'] and age < self.max_stale:
+                    self._recheck_in_background(name, client)
+                    return {'ok': True, 'message': 'Connected'}
+                if not state['ok']:
+                    self._recheck_in_background(name, client)
+                    return {'ok': False, 'message': f"Server unreachable: {state['message']}"}
+        return self._ping(name, client)
+
+    def forget(self, name: str):
+        """Drop the cached result of a connection"""
+        with self._lock:
+            self._states.pop(name, None)
+
+    def _state_for(self, name: str, client: MongoClient):
+        with self._lock:
+            state = self._states.get(name)
+        # A new client (edited connection) makes the old result meaningless; a weak reference,
+        # unlike id(), cannot match a new client allocated where a collected one was
+        if state and state['client']() is client:
+            return state
+        return None
+
+    def _ping(self, name: str, client: MongoClient) -> Dict:
+        try:
+            client.admin.command('ping')
+            result = {'ok': True, 'message': 'Connected'}
+        except Exception as e:
+            result = {'ok': False, 'message': str(e)}
+        with self._lock:
+            self._states[name] = {
+                'ok': result['ok'],
+                'message': result['message'],
+                'checked_at': time.monotonic(),
+                'client': weakref.ref(client),
+            }
+        return result
+
+    def _recheck_in_background(self, name: str, client: MongoClient):
+        """Start at most one background ping per connection"""
+        with self._lock:
+            if name in self._rechecking:
+                return
+            self._rechecking.add(name)
+
+        def recheck():
+            try:
+                self._ping(name, client)
+            finally:
+                with self._lock:
+                    self._rechecking.discard(name)
+
+        submit_background(recheck)
+
+
+connection_health = ConnectionHealth()
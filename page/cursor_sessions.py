@@ -0,0 +1,136 @@
+"""
+Cursor Sessions
+Keep server-side cursors open between eel calls so a view can stream batches as the user scrolls.
+"""
+
+import atexit
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Hard cap on cursors kept open across all views; the least recently used one is closed first
+MAX_OPEN_CURSORS = 20
+# Close a session nobody fetched from for this many seconds (below the server's 10 min cursor timeout)
+CURSOR_IDLE_TIMEOUT = 300
+REAPER_INTERVAL = 30
+
+
+class CursorSessionExpired(Exception):
+    """The session was closed, evicted or timed out"""
+
+
+class CursorSessionManager:
+    """Registry of open pymongo cursors (find or aggregate) keyed by session id"""
+
+    def __init__(self, max_open: int = MAX_OPEN_CURSORS, idle_timeout: float = CURSOR_IDLE_TIMEOUT):
+        self.max_open = max_open
+        self.idle_timeout = idle_timeout
+        self._sessions: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+
+    def open(self, cursor, info: Optional[Dict] = None, on_close: Optional[Callable[[], None]] = None) -> str:
+        """Register a cursor and return its session id; on_close runs once the cursor is closed"""
+        session_id = uuid.uuid4().hex
+        evicted = []
+        with self._lock:
+            while len(self._sessions) >= self.max_open:
+                oldest = min(self._sessions, key=lambda sid: self._sessions[sid]['last_used'])
+                evicted.append(self._sessions.pop(oldest))
+            self._sessions[session_id] = {
+                'cursor': cursor,
+                'info': info or {},
+                'last_used': time.monotonic(),
+                'fetched': 0,
+                'lock': threading.Lock(),
+                'on_close': on_close,
+            }
+        for entry in evicted:
+            self._close_cursor(entry)
+        self._ensure_reaper()
+        return session_id
+
+    def next_batch(self, session_id: str, batch_size: int) -> Tuple[List[Dict], bool]:
+        """Return up to batch_size documents and whether the cursor is exhausted"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+        if entry is None:
+            raise CursorSessionExpired(session_id)
+
+        with entry['lock']:
+            entry['last_used'] = time.monotonic()
+            cursor = entry['cursor']
+            documents = []
+            for document in cursor:
+                documents.append(document)
+                if len(documents) >= batch_size:
+                    break
+            exhausted = len(documents) < batch_size or not cursor.alive
+            entry['fetched'] += len(documents)
+            entry['last_used'] = time.monotonic()
+
+        if exhausted:
+            self.close(session_id)
+        return documents, exhausted
+
+    def fetched_count(self, session_id: str) -> int:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+        return entry['fetched'] if entry else 0
+
+    def close(self, session_id: str):
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+        if entry:
+            self._close_cursor(entry)
+
+    def close_connection(self, name: str):
+        """Close the sessions of a connection (after it is edited or removed)"""
+        with self._lock:
+            ids = [sid for sid, entry in self._sessions.items() if entry['info'].get('connection') == name]
+            entries = [self._sessions.pop(sid) for sid in ids]
+        for entry in entries:
+            self._close_cursor(entry)
+
+    def close_idle(self):
+        now = time.monotonic()
+        with self._lock:
+            idle = [sid for sid, entry in self._sessions.items()
+                    if now - entry['last_used'] > self.idle_timeout]
+            entries = [self._sessions.pop(sid) for sid in idle]
+        for entry in entries:
+            self._close_cursor(entry)
+
+    def close_all(self):
+        with self._lock:
+            entries = list(self._sessions.values())
+            self._sessions.clear()
+        for entry in entries:
+            self._close_cursor(entry)
+
+    def _close_cursor(self, entry: Dict):
+        try:
+            entry['cursor'].close()
+        except Exception as e:
+            print(f"Error closing cursor: {e}")
+        if entry['on_close']:
+            entry['on_close']()
+
+    def _ensure_reaper(self):
+        if self._reaper and self._reaper.is_alive():
+            return
+        with self._lock:
+            if self._reaper and self._reaper.is_alive():
+                return
+            self._reaper = threading.Thread(target=self._reap_loop, name='cursor-session-reaper', daemon=True)
+            self._reaper.start()
+
+    def _reap_loop(self):
+        while True:
+            time.sleep(REAPER_INTERVAL)
+            self.close_idle()
+
+
+cursor_sessions = CursorSessionManager()
+atexit.register(cursor_sessions.close_all)
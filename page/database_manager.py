@@ -6,11 +6,110 @@ Manage connections and operations with MongoDB.
 import json
 import os
 import sys
+import threading
+import time
 import urllib.parse
-from typing import Dict, List, Optional
-from pymongo import MongoClient
+import uuid
+from typing import Dict, List, Optional, Tuple
+import bson
+from bson import json_util
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
 
+from background import submit_background
+from client_registry import client_registry
+from collection_stats import COLL_STATS_STAGE, stats_batches, summarize_coll_stats, summarize_coll_stats_command
+from cursor_sessions import CursorSessionExpired, cursor_sessions
+from export_engine import (EXPORT_WORKERS, EXPORT_WRITERS, check_compression, csv_columns, export_collection,
+                           export_partitioned, export_path, run_exports, write_bson_metadata)
+from facets import FACET_LIMIT, compute_facets
+from connection_health import connection_health
 from crypto_config import maybe_decrypt_field, maybe_encrypt_field, derive_fernet_key
+from grid_format import build_preview_stages, to_columnar
+from index_advisor import (case_insensitive_collation, distinct_index, field_operator_support, find_sort_index,
+                           normalize_sort, plain_indexes, query_collation)
+from jobs import jobs
+from page_cache import page_cache
+from pagination import encode_cursor_token, keyset_filter
+from query_builder import collation_fields, compile_conditions
+from query_plan import EXPLAIN_VERBOSITIES, summarize_aggregate_explain, summarize_explain
+from schema_inference import schema_inference
+from ttl_cache import TTLCache
+
+# Exact counts per (connection, database, collection, filter); dropped on writes made through the app
+COUNT_CACHE_TTL = 300
+count_cache = TTLCache(ttl=COUNT_CACHE_TTL)
+
+# Storage / latency stats per (connection, database, collection)
+STATS_CACHE_TTL = 120
+stats_cache = TTLCache(ttl=STATS_CACHE_TTL)
+
+# Collection names per (connection, database), filtered and paged for the collections table
+COLLECTION_NAMES_TTL = 60
+collection_names_cache = TTLCache(ttl=COLLECTION_NAMES_TTL)
+COLLECTIONS_PAGE_SIZE = 100
+
+# listDatabases result per connection: served as-is while fresh, then served stale while a
+# background refresh runs, until the retention period drops it altogether
+DATABASE_LIST_TTL = 30
+DATABASE_LIST_RETENTION = 600
+database_list_cache = TTLCache(ttl=DATABASE_LIST_RETENTION)
+_database_list_refreshing = set()
+_database_list_lock = threading.Lock()
+
+# index_information() per (connection, database, collection), read by every grid query plan,
+# and the search collation chosen from it per (connection, database, collection, 'collation',
+# fields); both are dropped on index changes and writes made through the app
+INDEX_CACHE_TTL = 60
+index_cache = TTLCache(ttl=INDEX_CACHE_TTL)
+
+# Top values per (connection, database, collection, field, limit); dropped on writes made through the app
+FACET_CACHE_TTL = 300
+facet_cache = TTLCache(ttl=FACET_CACHE_TTL)
+
+# Sorting a larger collection without a supporting index needs the user's confirmation
+SORT_CONFIRM_THRESHOLD = 100000
+
+# The data view warns before a filtered search scans a collection larger than this;
+# a connection can override it with 'collscan_warn_threshold' in config.json
+COLLSCAN_WARN_THRESHOLD = 1000000
+
+# Documents per insert_many of a collection copy
+COPY_BATCH_SIZE = 1000
+# list_indexes() keys that belong to the source index, not its definition
+INDEX_SPEC_SKIP = ('v', 'ns')
+
+# Index key types accepted by create_index
+INDEX_KEY_TYPES = (1, -1, 'text', 'hashed', '2dsphere', '2d')
+
+# Default server-side time limit of pipelines run from the aggregation view
+AGGREGATE_MAX_TIME_MS = 60000
+
+
+def forget_connection_caches(name: str):
+    """
+    Drop everything cached under a connection name, so a connection re-added or edited
+    under the same name never shows results of the server it pointed at before
+    """
+    client_registry.invalidate(name)
+    connection_health.forget(name)
+    cursor_sessions.close_connection(name)
+    database_list_cache.invalidate(name)
+    for cache in (count_cache, stats_cache, collection_names_cache, facet_cache, index_cache):
+        cache.invalidate_prefix((name,))
+    page_cache.invalidate_prefix((name,))
+    schema_inference.invalidate((name,))
+
+
+def _server_address(connection: Dict) -> Tuple[str, int]:
+    """host / port a saved connection points at"""
+    return str(connection.get('host') or '').strip().lower(), int(connection.get('port') or 27017)
+
+
+def _collection_uuid(db, collection_name: str):
+    """UUID of a collection from listCollections, None when it does not exist (or the server has none)"""
+    info = next(iter(db.list_collections(filter={'name': collection_name})), None)
+    return (info or {}).get('info', {}).get('uuid')
 
 
 class MongoDBConnectionManager:
@@ -133,6 +232,7 @@ class MongoDBConnectionManager:
                 'password': password
             }
             self.connections.append(new_connection)
+            forget_connection_caches(name)
             return self.save_connections()
         except Exception as e:
             print(f"Error adding connection: {e}")
@@ -142,6 +242,7 @@ class MongoDBConnectionManager:
         """Remove connection by name"""
         try:
             self.connections = [conn for conn in self.connections if conn['name'] != name]
+            forget_connection_caches(name)
             return self.save_connections()
         except Exception as e:
             print(f"Error removing connection: {e}")
@@ -161,22 +262,30 @@ class MongoDBClient:
     def __init__(self, connection: Dict):
         self.connection = connection
         self.client = None
+        self.connect_error = ""
     
-    def connect(self) -> bool:
-        """Connect to MongoDB"""
+    def connect(self, force_check: bool = False) -> bool:
+        """Connect to MongoDB using the shared pooled client of this connection"""
         try:
             connection_string = self._build_connection_string()
-            self.client = MongoClient(connection_string, serverSelectionTimeoutMS=5000)
-            self.client.admin.command('ping')
+            self.client = client_registry.get_client(self.connection, connection_string)
+            # Ping only when the cached health result is missing or stale
+            health = connection_health.check(self.connection['name'], self.client, force=force_check)
+            if not health['ok']:
+                self.connect_error = health['message']
+                print(f"Error connecting: {health['message']}")
+                self.client = None
+                return False
+            self.connect_error = ""
             return True
         except Exception as e:
+            self.connect_error = str(e)
             print(f"Error connecting: {e}")
             return False
     
     def disconnect(self):
-        """Close connection"""
-        if self.client:
-            self.client.close()
+        """Release the pooled client (the registry keeps it open for reuse)"""
+        self.client = None
     
     def _build_connection_string(self) -> str:
         """Build connection string"""
@@ -187,11 +296,11 @@ class MongoDBClient:
         else:
             return f"mongodb://{self.connection['host']}:{self.connection['port']}/"
     
-    def test_connection(self) -> Dict:
-        """Test connection"""
+    def test_connection(self, force: bool = True) -> Dict:
+        """Test connection (force=False accepts a fresh cached health result)"""
         try:
-            if not self.connect():
-                return {'success': False, 'message': 'Could not connect'}
+            if not self.connect(force_check=force):
+                return {'success': False, 'message': self.connect_error or 'Could not connect'}
             
             self.disconnect()
             
@@ -204,98 +313,976 @@ class MongoDBClient:
             self.disconnect()
             return {'success': False, 'message': f'Error: {str(e)}'}
     
-    def list_databases(self) -> Dict:
-        """Get list of all databases"""
+    def list_databases(self, refresh: bool = False) -> Dict:
+        """
+        Databases with their size on disk, from one listDatabases command. A cached list older
+        than DATABASE_LIST_TTL is returned at once while a background refresh replaces it.
+        """
         try:
+            key = self.connection['name']
+            entry = None if refresh else database_list_cache.get_entry(key)
+            if entry:
+                age, overview = entry
+                stale = age > DATABASE_LIST_TTL
+                if stale:
+                    with _database_list_lock:
+                        start_refresh = key not in _database_list_refreshing
+                        _database_list_refreshing.add(key)
+                    if start_refresh:
+                        submit_background(self._refresh_database_list, key)
+                return dict(overview, age=int(age), stale=stale)
+
             if not self.connect():
                 return {'success': False, 'message': 'Could not connect'}
             
-            databases = sorted(self.client.list_database_names())
+            overview = self._read_database_list()
             
             self.disconnect()
-            return {'success': True, 'databases': databases}
+            return dict(overview, age=0, stale=False)
             
         except Exception as e:
             self.disconnect()
             return {'success': False, 'message': f'Error: {str(e)}'}
+
+    def _read_database_list(self) -> Dict:
+        """Run listDatabases and cache the overview; the client must be connected"""
+        output = self.client.admin.command({'listDatabases': 1})
+        details = sorted(
+            ({'name': db['name'], 'size_on_disk': int(db.get('sizeOnDisk', 0)), 'empty': bool(db.get('empty'))}
+             for db in output.get('databases', [])),
+            key=lambda db: db['name'])
+        overview = {
+            'success': True,
+            'databases': [db['name'] for db in details],
+            'details': details,
+            'total_size': int(output.get('totalSize', sum(db['size_on_disk'] for db in details))),
+        }
+        database_list_cache.set(self.connection['name'], overview)
+        return overview
+
+    def _refresh_database_list(self, key: str):
+        """Background task: re-read the database list on a separate client handle"""
+        try:
+            client = MongoDBClient(self.connection)
+            if client.connect():
+                client._read_database_list()
+        finally:
+            with _database_list_lock:
+                _database_list_refreshing.discard(key)
     
-    def get_collections(self, database_name: str) -> Dict:
-        """Get list of collections in database"""
+    def get_collections(self, database_name: str, name_filter: str = "", page: int = 1, page_size: int = 0) -> Dict:
+        """
+        Collection names of a database, cached per database. name_filter keeps names containing
+        it (case-insensitive); page_size > 0 returns one page of the filtered, sorted list.
+        """
         try:
             if not self.connect():
                 return {'success': False, 'message': 'Could not connect'}
             
-            db = self.client[database_name]
-            collections = sorted(list(db.list_collection_names()))
+            key = (self.connection['name'], database_name)
+            collections = collection_names_cache.get(key)
+            if collections is None:
+                collections = sorted(self.client[database_name].list_collection_names())
+                collection_names_cache.set(key, collections)
             
             self.disconnect()
-            return {'success': True, 'collections': collections}
+            
+            total = len(collections)
+            if name_filter:
+                needle = name_filter.lower()
+                collections = [name for name in collections if needle in name.lower()]
+            matched = len(collections)
+            page = max(int(page or 1), 1)
+            if page_size and page_size > 0:
+                collections = collections[(page - 1) * page_size:page * page_size]
+            return {
+                'success': True,
+                'collections': collections,
+                'total': total,
+                'matched': matched,
+                'page': page,
+                'page_size': page_size,
+            }
             
         except Exception as e:
             self.disconnect()
             return {'success': False, 'message': f'Error: {str(e)}'}
     
-    def get_collection_fields(self, database_name: str, collection_name: str) -> Dict:
-        """Get list of fields in collection"""
+    def _collection_stats(self, database_name: str, collection_name: str, refresh: bool = False) -> Dict:
+        """Cached storage and latency summary of one collection; the client must be connected"""
+        key = (self.connection['name'], database_name, collection_name)
+        entry = None if refresh else stats_cache.get_entry(key)
+        if entry:
+            age, stats = entry
+            return dict(stats, age=int(age), cached=True)
+
+        db = self.client[database_name]
+        try:
+            stats = summarize_coll_stats(db[collection_name].aggregate([COLL_STATS_STAGE]))
+        except Exception as e:
+            # $collStats needs MongoDB 3.4+; the collStats command still reports storage
+            print(f"Error reading $collStats of {collection_name}: {e}")
+            stats = summarize_coll_stats_command(db.command({'collStats': collection_name}))
+        stats_cache.set(key, stats)
+        return dict(stats, age=0, cached=False)
+
+    def get_collection_stats(self, database_name: str, collection_name: str, refresh: bool = False) -> Dict:
+        """Document count, data / storage / index sizes and operation latencies of a collection"""
+        try:
+            if not self.connect():
+                return {'success': False, 'message': 'Could not connect'}
+
+            stats = self._collection_stats(database_name, collection_name, refresh)
+
+            self.disconnect()
+            return {'success': True, 'stats': stats}
+
+        except Exception as e:
+            self.disconnect()
+            return {'success': False, 'message': f'Error: {str(e)}'}
+
+    def start_collections_stats(self, database_name: str, collection_names: List[str], refresh: bool = False) -> Dict:
+        """
+        Stats for the collections table. Cached entries come back at once; the rest are read
+        concurrently in a batch whose rows poll_collections_stats hands over as they finish.
+        """
+        stats = {}
+        missing = []
+        for name in collection_names:
+            entry = None if refresh else stats_cache.get_entry((self.connection['name'], database_name, name))
+            if entry:
+                stats[name] = dict(entry[1], age=int(entry[0]), cached=True)
+            else:
+                missing.append(name)
+        batch_id = None
+        if missing:
+            batch_id = stats_batches.start(
+                missing, lambda name: self._read_collection_stats(database_name, name, refresh))
+        return {'success': True, 'stats': stats, 'batch_id': batch_id, 'pending': len(missing)}
+
+    def _read_collection_stats(self, database_name: str, collection_name: str, refresh: bool) -> Dict:
+        """Batch task: stats of one collection on its own client handle"""
+        client = MongoDBClient(self.connection)
+        if not client.connect():
+            raise RuntimeError(client.connect_error or 'Could not connect')
+        with client_registry.in_use(self.connection['name']):
+            return client._collection_stats(database_name, collection_name, refresh)
+
+    def poll_collections_stats(self, batch_id: str) -> Dict:
+        """Rows of a stats batch that finished since the previous poll"""
+        result = stats_batches.poll(batch_id)
+        if result is None:
+            return {'success': False, 'message': 'Stats batch not found'}
+        return {'success': True, **result}
+
+    def cancel_collections_stats(self, batch_id: str) -> Dict:
+        stats_batches.cancel(batch_id)
+        return {'success': True}
+
+    def get_collection_fields(self, database_name: str, collection_name: str, sample_size: int = 0,
+                              refresh: bool = False) -> Dict:
+        """
+        Field paths of a collection (embedded documents as dot-paths, _id first) with per-field
+        type histograms and presence ratios, inferred from a cached $sample (see schema_inference).
+        """
         try:
             if not self.connect():
                 return {'success': False, 'message': 'Could not connect'}
+
+            collection = self.client[database_name][collection_name]
+            key = (self.connection['name'], database_name, collection_name)
+            schema = schema_inference.infer(key, collection, sample_size=sample_size or None, refresh=refresh)
+
+            self.disconnect()
+            return {'success': True, 'fields': [field['path'] for field in schema['schema']], **schema}
+
+        except Exception as e:
+            self.disconnect()
+            return {'success': False, 'message': f'Error: {str(e)}'}
+
+    def _search_conditions(self, search_field: str, search_operator: str, search_value: str) -> List[Dict]:
+        """The search toolbar's field / operator / value as query-builder conditions ('like' excluded)"""
+        if not (search_field and search_operator and search_value) or search_operator == "like":
+            return []
+        operator = "eq" if search_operator == "=" else search_operator
+        return [{'field': search_field, 'operator': operator, 'value': search_value, 'type': 'string'}]
+
+    def _search_collation(self, collection, index_info: Dict, search_field: str, search_operator: str,
+                          search_value: str, conditions: Optional[List[Dict]] = None) -> Optional[Dict]:
+        """
+        Collation of a case-insensitive index that can answer the eq_ci searches, if there is one.
+        The collation also applies to the _id sort and keyset bounds, where string _ids differing
+        only by case would compare equal, so collections with string _ids keep the regex instead.
+        The choice is cached in index_cache next to the index list it comes from.
+        """
+        fields = collation_fields(self._search_conditions(search_field, search_operator, search_value)
+                                  + list(conditions or []))
+        if not fields:
+            return None
+        key = (self.connection['name'], collection.database.name, collection.name, 'collation', tuple(fields))
+        entry = index_cache.get_entry(key)
+        if entry:
+            return entry[1]
+        collation = case_insensitive_collation(index_info, fields)
+        # $type on _id is a bounded scan of the _id index
+        if collation and collection.find_one({'_id': {'$type': 'string'}}, {'_id': 1}) is not None:
+            collation = None
+        index_cache.set(key, collation)
+        return collation
+
+    def _build_search_filter(self, search_field: str, search_operator: str, search_value: str,
+                             conditions: Optional[List[Dict]] = None, combinator: str = "and",
+                             collation: Optional[Dict] = None) -> Dict:
+        """Build the find filter for the search toolbar and the typed conditions of the query builder"""
+        query_filter = {}
+        if search_field and search_operator and search_value:
+            if search_operator == "like":
+                query_filter[search_field] = {"$regex": search_value, "$options": "i"}
+            else:
+                query_filter = compile_conditions(
+                    self._search_conditions(search_field, search_operator, search_value),
+                    use_collation=collation is not None)
+        condition_filter = compile_conditions(conditions, combinator, use_collation=collation is not None)
+        if query_filter and condition_filter:
+            return {'$and': [query_filter, condition_filter]}
+        return query_filter or condition_filter
+
+    def _count_cache_key(self, database_name: str, collection_name: str, query_filter: Dict,
+                         collation: Optional[Dict] = None) -> tuple:
+        query = [query_filter, collation] if collation else query_filter
+        return (self.connection['name'], database_name, collection_name,
+                json_util.dumps(query, sort_keys=True))
+
+    def _exact_count(self, collection, database_name: str, collection_name: str, query_filter: Dict,
+                     collation: Optional[Dict] = None) -> int:
+        """count_documents with the result cached per filter"""
+        key = self._count_cache_key(database_name, collection_name, query_filter, collation)
+        total = count_cache.get(key)
+        if total is None:
+            count_options = {'collation': collation} if collation else {}
+            total = collection.count_documents(query_filter, **count_options)
+            count_cache.set(key, total)
+        return total
+
+    def _invalidate_collection_caches(self, database_name: str, collection_name: str):
+        """Forget cached results of a collection after a write made through the app"""
+        count_cache.invalidate_prefix((self.connection['name'], database_name, collection_name))
+        page_cache.invalidate((self.connection['name'], database_name, collection_name))
+        stats_cache.invalidate((self.connection['name'], database_name, collection_name))
+        facet_cache.invalidate_prefix((self.connection['name'], database_name, collection_name))
+        index_cache.invalidate_prefix((self.connection['name'], database_name, collection_name))
+        schema_inference.invalidate((self.connection['name'], database_name, collection_name))
+        # Writes can create or drop the collection ($out, import, drop)
+        collection_names_cache.invalidate((self.connection['name'], database_name))
+
+    def _index_information(self, database_name: str, collection_name: str) -> Dict:
+        """Cached index_information() of a collection; the client must be connected"""
+        key = (self.connection['name'], database_name, collection_name)
+        index_info = index_cache.get(key)
+        if index_info is None:
+            index_info = self.client[database_name][collection_name].index_information()
+            index_cache.set(key, index_info)
+        return index_info
+
+    def _cached_count(self, collection) -> int:
+        """Document count from the cached collection stats when there are some, else the metadata estimate"""
+        stats = stats_cache.get((self.connection['name'], collection.database.name, collection.name))
+        if stats and 'count' in stats:
+            return stats['count']
+        return collection.estimated_document_count()
+
+    def _plan_sort(self, collection, index_info: Dict, query_filter: Dict, sort_spec: Optional[List],
+                   confirmed: bool, collection_size: Optional[int] = None, collation: Optional[Dict] = None):
+        """
+        Resolve the sort of a grid query. Returns (sort_keys, index_name, refusal) where refusal
+        is a needs_confirmation response for an unindexed sort on a large collection.
+        """
+        sort_keys = normalize_sort(sort_spec)
+        sort_index = find_sort_index(plain_indexes(index_info, collation), sort_keys, query_filter)
+        if sort_index:
+            return sort_keys, sort_index, None
+        if not confirmed:
+            size = collection_size if collection_size is not None else self._cached_count(collection)
+            if size > SORT_CONFIRM_THRESHOLD:
+                fields = ', '.join(f'{field} {"desc" if order < 0 else "asc"}' for field, order in sort_keys)
+                return sort_keys, None, {
+                    'success': False,
+                    'needs_confirmation': True,
+                    'message': f'No index supports sorting by {fields}. The server would sort '
+                               f'~{size:,} documents in memory. Continue?'
+                }
+        # Blocking sort anyway: add _id so ties page in a stable order
+        if all(field != '_id' for field, _ in sort_keys):
+            sort_keys.append(('_id', 1))
+        return sort_keys, None, None
+
+    def _page_cursor(self, collection, query_filter: Dict, sort_keys: List, skip: int, limit: int,
+                     columns: Optional[List[str]], preview_length: int, allow_disk_use: bool,
+                     collation: Optional[Dict] = None):
+        """find() cursor, or an aggregation when the grid asked for projected/truncated values"""
+        preview_stages = build_preview_stages(columns, preview_length)
+        if preview_stages:
+            pipeline = [{"$match": query_filter}, {"$sort": dict(sort_keys)}]
+            if skip:
+                pipeline.append({"$skip": skip})
+            if limit:
+                pipeline.append({"$limit": limit})
+            aggregate_options = {'allowDiskUse': True} if allow_disk_use else {}
+            if collation:
+                aggregate_options['collation'] = collation
+            return collection.aggregate(pipeline + preview_stages, **aggregate_options)
+        find_options = {'allow_disk_use': True} if allow_disk_use else {}
+        if collation:
+            find_options['collation'] = collation
+        return collection.find(query_filter, **find_options).sort(sort_keys).skip(skip).limit(limit)
+
+    def get_collection_data(self, database_name: str, collection_name: str, limit: int = 50,
+                           skip: int = 0,
+                           search_field: str = "", search_operator: str = "",
+                           search_value: str = "",
+                           cursor_token: str = "", direction: str = "",
+                           count_mode: str = "auto",
+                           columns: Optional[List[str]] = None, preview_length: int = 0,
+                           wire_format: str = "documents",
+                           sort_spec: Optional[List] = None, allow_disk_use: bool = False,
+                           confirm_unindexed_sort: bool = False, prefetch: str = "",
+                           conditions: Optional[List[Dict]] = None, combinator: str = "and",
+                           refresh: bool = False) -> Dict:
+        """
+        Get collection data with optional search and pagination.
+        With cursor_token and direction ('next'/'prev') the page is read with an _id range
+        (keyset pagination); otherwise skip is used as the slower jump-to-page fallback.
+        count_mode 'auto' returns an estimated total without a filter, a cached exact total
+        with one, or total=None with total_pending=True so the caller can fetch the exact
+        count later via count_documents(); 'exact' always counts before returning.
+        columns / preview_length switch to an aggregation that projects the page down to the
+        displayed columns and truncated values (see grid_format.build_preview_stages).
+        wire_format 'columnar' returns columns/rows/types instead of a list of documents.
+        sort_spec is a list of [field, 1|-1] run on the server. A sort no index can serve on a
+        collection above SORT_CONFIRM_THRESHOLD returns needs_confirmation unless
+        confirm_unindexed_sort or allow_disk_use is set. Keyset paging applies to _id sorts.
+        Pages are kept in page_cache; prefetch 'next' (or 'both') reads the following (and
+        previous) page in the background so paging forward is usually answered from memory.
+        conditions / combinator add typed query-builder conditions (see query_builder) to the search.
+        refresh (an explicit reload) drops the collection's cached pages, counts and indexes first,
+        since writes made outside the app do not invalidate them.
+        """
+        namespace = (self.connection['name'], database_name, collection_name)
+        if refresh:
+            page_cache.invalidate(namespace)
+            count_cache.invalidate_prefix(namespace)
+            index_cache.invalidate_prefix(namespace)
+        page_args = dict(limit=limit, skip=skip, search_field=search_field, search_operator=search_operator,
+                         search_value=search_value, cursor_token=cursor_token, direction=direction,
+                         count_mode=count_mode, columns=columns, preview_length=preview_length,
+                         wire_format=wire_format, sort_spec=sort_spec, allow_disk_use=allow_disk_use,
+                         conditions=conditions, combinator=combinator)
+        signature = self._page_signature(page_args)
+        
+        cached = page_cache.get(namespace, signature)
+        if cached is not None:
+            page, count_key = cached
+            result = dict(page, cached=True)
+            if result.get('total_pending'):
+                total = count_cache.get(count_key)
+                if total is not None:
+                    result.update(total=total, total_pending=False)
+        else:
+            generation = page_cache.generation(namespace)
+            result, count_key = self._read_page(database_name, collection_name,
+                                                confirm_unindexed_sort=confirm_unindexed_sort, **page_args)
+            if result.get('success'):
+                page_cache.put(namespace, signature, (result, count_key), generation)
+        
+        if prefetch and result.get('success'):
+            self._prefetch_neighbours(database_name, collection_name, page_args, result,
+                                      include_previous=prefetch == 'both',
+                                      confirm_unindexed_sort=confirm_unindexed_sort)
+        return result
+
+    def _page_signature(self, page_args: Dict) -> str:
+        """Hashable identity of a page request"""
+        return json_util.dumps(page_args, sort_keys=True)
+
+    def _prefetch_neighbours(self, database_name: str, collection_name: str, page_args: Dict, page: Dict,
+                             include_previous: bool = False, confirm_unindexed_sort: bool = False):
+        """Read the pages next to the one just returned into page_cache on the background pool"""
+        namespace = (self.connection['name'], database_name, collection_name)
+        limit = page_args['limit']
+        row_count = len(page.get('rows', page.get('data', [])))
+        neighbours = []
+        if row_count >= limit:
+            if page.get('next_cursor'):
+                neighbours.append(dict(page_args, skip=0, cursor_token=page['next_cursor'], direction='next'))
+            elif not page_args['cursor_token']:
+                neighbours.append(dict(page_args, skip=page_args['skip'] + limit))
+        if include_previous:
+            if page.get('prev_cursor') and page_args['cursor_token']:
+                neighbours.append(dict(page_args, skip=0, cursor_token=page['prev_cursor'], direction='prev'))
+            elif not page_args['cursor_token'] and page_args['skip'] >= limit:
+                neighbours.append(dict(page_args, skip=page_args['skip'] - limit))
+        
+        for args in neighbours:
+            signature = self._page_signature(args)
+            if not page_cache.begin_fetch(namespace, signature):
+                continue
+            submit_background(self._prefetch_page, database_name, collection_name, args, signature,
+                              confirm_unindexed_sort)
+
+    def _prefetch_page(self, database_name: str, collection_name: str, page_args: Dict, signature: str,
+                       confirm_unindexed_sort: bool = False):
+        namespace = (self.connection['name'], database_name, collection_name)
+        try:
+            generation = page_cache.generation(namespace)
+            # A separate instance: self.client belongs to the request that triggered the prefetch
+            result, count_key = MongoDBClient(self.connection)._read_page(
+                database_name, collection_name, confirm_unindexed_sort=confirm_unindexed_sort, **page_args)
+            if result.get('success'):
+                page_cache.put(namespace, signature, (result, count_key), generation)
+        finally:
+            page_cache.end_fetch(namespace, signature)
+
+    def _read_page(self, database_name: str, collection_name: str, limit: int = 50,
+                   skip: int = 0,
+                   search_field: str = "", search_operator: str = "",
+                   search_value: str = "",
+                   cursor_token: str = "", direction: str = "",
+                   count_mode: str = "auto",
+                   columns: Optional[List[str]] = None, preview_length: int = 0,
+                   wire_format: str = "documents",
+                   sort_spec: Optional[List] = None, allow_disk_use: bool = False,
+                   confirm_unindexed_sort: bool = False,
+                   conditions: Optional[List[Dict]] = None, combinator: str = "and") -> Tuple[Dict, Optional[tuple]]:
+        """Read one grid page from the server (see get_collection_data); returns (page, count cache key)"""
+        try:
+            if not self.connect():
+                return {'success': False, 'message': 'Could not connect'}, None
             
             db = self.client[database_name]
             collection = db[collection_name]
             
-            # Get sample docs to find fields
-            sample_docs = list(collection.find().limit(10))
+            index_info = self._index_information(database_name, collection_name)
+            collation = self._search_collation(collection, index_info, search_field, search_operator, search_value,
+                                               conditions)
+            query_filter = self._build_search_filter(search_field, search_operator, search_value,
+                                                     conditions, combinator, collation)
+            count_key = self._count_cache_key(database_name, collection_name, query_filter, collation)
+            
+            total_estimated = False
+            if count_mode == "exact":
+                total = self._exact_count(collection, database_name, collection_name, query_filter, collation)
+            elif not query_filter:
+                # Collection metadata count, no scan
+                total = collection.estimated_document_count()
+                total_estimated = True
+            else:
+                total = count_cache.get(count_key)
+            
+            sort_keys, sort_index, refusal = self._plan_sort(
+                collection, index_info, query_filter, sort_spec, confirm_unindexed_sort or allow_disk_use,
+                total if total_estimated else None, collation)
+            if refusal:
+                self.disconnect()
+                return refusal, count_key
+            
+            keyset = len(sort_keys) == 1 and sort_keys[0][0] == '_id'
+            page_skip = skip
+            page_filter = query_filter
+            read_backwards = False
+            if keyset and cursor_token and direction in ('next', 'prev'):
+                page_skip = 0
+                page_filter = keyset_filter(query_filter, cursor_token, direction, sort_keys[0][1])
+                # Walk backwards from the boundary for 'prev', order is restored below
+                read_backwards = direction == 'prev'
+            read_sort = [(field, -order if read_backwards else order) for field, order in sort_keys]
+            
+            documents = list(self._page_cursor(collection, page_filter, read_sort, page_skip, limit,
+                                               columns, preview_length, allow_disk_use, collation))
+            if read_backwards:
+                documents.reverse()
+            
+            prev_cursor = encode_cursor_token(documents[0]['_id']) if keyset and documents else ""
+            next_cursor = encode_cursor_token(documents[-1]['_id']) if keyset and documents else ""
+            
+            if wire_format == "columnar":
+                page = to_columnar(documents)
+            else:
+                # Convert ObjectId to string
+                for doc in documents:
+                    if '_id' in doc:
+                        doc['_id'] = str(doc['_id'])
+                page = {'data': documents}
             
-            fields = set()
-            for doc in sample_docs:
-                fields.update(doc.keys())
+            self.disconnect()
+            return {
+                'success': True,
+                **page,
+                'total': total,
+                'total_estimated': total_estimated,
+                'total_pending': total is None,
+                'prev_cursor': prev_cursor,
+                'next_cursor': next_cursor,
+                'sort': [[field, order] for field, order in sort_keys],
+                'sort_index': sort_index,
+                'collation': collation
+            }, count_key
             
-            fields = sorted(list(fields))
-            fields = sorted(list(fields))
+        except Exception as e:
+            self.disconnect()
+            return {'success': False, 'message': f'Error: {str(e)}'}, None
+            
+    def open_cursor_session(self, database_name: str, collection_name: str,
+                            search_field: str = "", search_operator: str = "", search_value: str = "",
+                            sort_spec: Optional[List] = None, allow_disk_use: bool = False,
+                            confirm_unindexed_sort: bool = False,
+                            columns: Optional[List[str]] = None, preview_length: int = 0,
+                            batch_size: int = 100,
+                            conditions: Optional[List[Dict]] = None, combinator: str = "and") -> Dict:
+        """
+        Open one server cursor for a grid view and return its first batch (columnar).
+        Further batches come from fetch_cursor_batch(); the pooled client stays connected.
+        """
+        try:
+            if not self.connect():
+                return {'success': False, 'message': 'Could not connect'}
+            
+            collection = self.client[database_name][collection_name]
+            index_info = self._index_information(database_name, collection_name)
+            collation = self._search_collation(collection, index_info, search_field, search_operator, search_value,
+                                               conditions)
+            query_filter = self._build_search_filter(search_field, search_operator, search_value,
+                                                     conditions, combinator, collation)
+            sort_keys, sort_index, refusal = self._plan_sort(
+                collection, index_info, query_filter, sort_spec, confirm_unindexed_sort or allow_disk_use,
+                collation=collation)
+            if refusal:
+                self.disconnect()
+                return refusal
+            
+            cursor = self._page_cursor(collection, query_filter, sort_keys, 0, 0,
+                                       columns, preview_length, allow_disk_use, collation)
+            cursor.batch_size(batch_size)
+            # The pooled client must outlive the scroll session, however long it stays open
+            session_id = cursor_sessions.open(cursor, {
+                'connection': self.connection['name'],
+                'namespace': f'{database_name}.{collection_name}',
+            }, on_close=client_registry.pin(self.connection['name']))
             
             self.disconnect()
-            return {'success': True, 'fields': fields}
+            result = fetch_cursor_batch(session_id, batch_size)
+            result['sort_index'] = sort_index
+            return result
             
         except Exception as e:
             self.disconnect()
             return {'success': False, 'message': f'Error: {str(e)}'}
-    
-    def get_collection_data(self, database_name: str, collection_name: str, limit: int = 50,
-                           skip: int = 0,
-                           search_field: str = "", search_operator: str = "",
-                           search_value: str = "") -> Dict:
-        """Get collection data with optional search and pagination"""
+
+    def count_documents(self, database_name: str, collection_name: str,
+                        search_field: str = "", search_operator: str = "",
+                        search_value: str = "",
+                        conditions: Optional[List[Dict]] = None, combinator: str = "and") -> Dict:
+        """Exact number of documents matching the search (cached per filter)"""
+        try:
+            if not self.connect():
+                return {'success': False, 'message': 'Could not connect'}
+            
+            collection = self.client[database_name][collection_name]
+            index_info = self._index_information(database_name, collection_name)
+            collation = self._search_collation(collection, index_info, search_field, search_operator, search_value,
+                                               conditions)
+            query_filter = self._build_search_filter(search_field, search_operator, search_value,
+                                                     conditions, combinator, collation)
+            total = self._exact_count(collection, database_name, collection_name, query_filter, collation)
+            
+            self.disconnect()
+            return {'success': True, 'total': total}
+            
+        except Exception as e:
+            self.disconnect()
+            return {'success': False, 'message': f'Error: {str(e)}'}
+
+    def get_field_index_support(self, database_name: str, collection_name: str, field: str) -> Dict:
+        """Which search operators an index can answer for a field (index name or None per operator)"""
+        try:
+            if not self.connect():
+                return {'success': False, 'message': 'Could not connect'}
+            
+            index_info = self._index_information(database_name, collection_name)
+            operators = field_operator_support(index_info, field)
+            
+            self.disconnect()
+            return {'success': True, 'field': field, 'operators': operators}
+            
+        except Exception as e:
+            self.disconnect()
+            return {'success': False, 'message': f'Error: {str(e)}'}
+
+    def get_field_facets(self, database_name: str, collection_name: str, field: str, limit: int = FACET_LIMIT,
+                         refresh: bool = False) -> Dict:
+        """Most frequent values of a field with their counts, cached per collection and field (see facets)"""
+        if not field:
+            return {'success': False, 'message': 'Field is required'}
+        try:
+            key = (self.connection['name'], database_name, collection_name, field, limit)
+            entry = None if refresh else facet_cache.get_entry(key)
+            if entry:
+                age, facets = entry
+                return {'success': True, 'field': field, **facets, 'age': int(age), 'cached': True}
+
+            if not self.connect():
+                return {'success': False, 'message': 'Could not connect'}
+            
+            collection = self.client[database_name][collection_name]
+            index = distinct_index(self._index_information(database_name, collection_name), field)
+            facets = compute_facets(collection, field, limit, index)
+            facet_cache.set(key, facets)
+            
+            self.disconnect()
+            return {'success': True, 'field': field, **facets, 'age': 0, 'cached': False}
+            
+        except Exception as e:
+            self.disconnect()
+            return {'success': False, 'message': f'Error: {str(e)}'}
+
+    def explain_query(self, database_name: str, collection_name: str,
+                      search_field: str = "", search_operator: str = "", search_value: str = "",
+                      conditions: Optional[List[Dict]] = None, combinator: str = "and",
+                      sort_spec: Optional[List] = None, columns: Optional[List[str]] = None,
+                      limit: int = 50, skip: int = 0, verbosity: str = "queryPlanner") -> Dict:
+        """
+        Explain the grid query for a search (filter, sort, projection) without reading the page.
+        'queryPlanner' only plans; 'executionStats' also runs it and reports keys / documents
+        examined. warn is set when a filtered search would scan a collection larger than the
+        COLLSCAN warning threshold.
+        """
+        if verbosity not in EXPLAIN_VERBOSITIES:
+            return {'success': False, 'message': f'Unknown verbosity: {verbosity}'}
         try:
             if not self.connect():
                 return {'success': False, 'message': 'Could not connect'}
             
             db = self.client[database_name]
             collection = db[collection_name]
+            index_info = self._index_information(database_name, collection_name)
+            collation = self._search_collation(collection, index_info, search_field, search_operator, search_value,
+                                               conditions)
+            query_filter = self._build_search_filter(search_field, search_operator, search_value,
+                                                     conditions, combinator, collation)
+            
+            find_command = {'find': collection_name, 'filter': query_filter,
+                            'sort': dict(normalize_sort(sort_spec))}
+            if columns:
+                find_command['projection'] = {column: 1 for column in columns}
+            if limit:
+                find_command['limit'] = limit
+            if skip:
+                find_command['skip'] = skip
+            if collation:
+                find_command['collation'] = collation
+            summary = summarize_explain(db.command('explain', find_command, verbosity=verbosity))
+            
+            collection_size = collection.estimated_document_count()
+            threshold = int(self.connection.get('collscan_warn_threshold') or COLLSCAN_WARN_THRESHOLD)
+            if summary['execution']:
+                estimated_scan = max(summary['execution']['keys_examined'], summary['execution']['docs_examined'])
+            elif summary['collscan']:
+                estimated_scan = collection_size
+            else:
+                # Index bounds: the range size is only known after running with executionStats
+                estimated_scan = None
             
-            query_filter = {}
-            if search_field and search_operator and search_value:
-                if search_operator == "=":
-                    query_filter[search_field] = search_value
-                elif search_operator == "like":
-                    query_filter[search_field] = {"$regex": search_value, "$options": "i"}
+            self.disconnect()
+            return {
+                'success': True,
+                **summary,
+                'filter': json_util.dumps(query_filter),
+                'collation': collation,
+                'collection_size': collection_size,
+                'estimated_scan': estimated_scan,
+                'threshold': threshold,
+                'warn': bool(query_filter) and summary['collscan'] and collection_size > threshold
+            }
             
-            total = collection.count_documents(query_filter)
-            cursor = collection.find(query_filter).sort("_id", 1).skip(skip).limit(limit)
-            documents = list(cursor)
+        except Exception as e:
+            self.disconnect()
+            return {'success': False, 'message': f'Error: {str(e)}'}
+
+    def get_indexes(self, database_name: str, collection_name: str) -> Dict:
+        """Indexes of a collection with their options, size on disk and usage ($indexStats)"""
+        try:
+            if not self.connect():
+                return {'success': False, 'message': 'Could not connect'}
+            
+            collection = self.client[database_name][collection_name]
+            
+            sizes = {}
+            try:
+                # One document per shard on a sharded collection
+                for stats in collection.aggregate([{'$collStats': {'storageStats': {}}}]):
+                    for name, size in stats.get('storageStats', {}).get('indexSizes', {}).items():
+                        sizes[name] = sizes.get(name, 0) + int(size)
+            except Exception as e:
+                print(f"Error reading index sizes: {e}")
+            
+            usage = {}
+            try:
+                for stats in collection.aggregate([{'$indexStats': {}}]):
+                    entry = usage.setdefault(stats['name'], {'ops': 0, 'since': None, 'building': False})
+                    accesses = stats.get('accesses', {})
+                    entry['ops'] += int(accesses.get('ops', 0))
+                    since = accesses.get('since')
+                    if since and (entry['since'] is None or since < entry['since']):
+                        entry['since'] = since
+                    entry['building'] = entry['building'] or bool(stats.get('building'))
+            except Exception as e:
+                print(f"Error reading index usage: {e}")
+            
+            indexes = []
+            for spec in collection.list_indexes():
+                name = spec['name']
+                used = usage.get(name, {})
+                partial = spec.get('partialFilterExpression')
+                indexes.append({
+                    'name': name,
+                    'keys': [[field, int(kind) if isinstance(kind, (int, float)) else kind]
+                             for field, kind in spec['key'].items()],
+                    'unique': bool(spec.get('unique')),
+                    'sparse': bool(spec.get('sparse')),
+                    'hidden': bool(spec.get('hidden')),
+                    'partial_filter': json_util.dumps(partial) if partial else None,
+                    'expire_after_seconds': spec.get('expireAfterSeconds'),
+                    'collation': query_collation(spec.get('collation')),
+                    'size': sizes.get(name),
+                    'ops': used.get('ops'),
+                    'since': used['since'].isoformat() if used.get('since') else None,
+                    'building': used.get('building', False)
+                })
+            
+            self.disconnect()
+            return {'success': True, 'indexes': indexes, 'total_size': sum(sizes.values())}
+            
+        except Exception as e:
+            self.disconnect()
+            return {'success': False, 'message': f'Error: {str(e)}'}
+
+    def _index_spec(self, keys: List, options: Dict) -> Tuple[List[Tuple[str, object]], Dict]:
+        """Validate create_index input from the browser into pymongo keys and options"""
+        index_keys = []
+        for item in keys or []:
+            field = str(item[0]).strip() if item else ''
+            if not field:
+                raise ValueError('Every index key needs a field')
+            kind = item[1] if len(item) > 1 else 1
+            if isinstance(kind, str) and kind.lstrip('-').isdigit():
+                kind = int(kind)
+            if kind not in INDEX_KEY_TYPES:
+                raise ValueError(f'Unsupported index type for {field}: {kind}')
+            index_keys.append((field, kind))
+        if not index_keys:
+            raise ValueError('Choose at least one field')
+        
+        # Same default name as the server / pymongo: field_direction joined by _
+        name = (options.get('name') or '').strip()
+        index_options = {'name': name or '_'.join(f'{field}_{kind}' for field, kind in index_keys)}
+        if options.get('unique'):
+            index_options['unique'] = True
+        if options.get('sparse'):
+            index_options['sparse'] = True
+        partial_filter = options.get('partial_filter')
+        if partial_filter:
+            if isinstance(partial_filter, str):
+                partial_filter = json_util.loads(partial_filter)
+            if not isinstance(partial_filter, dict):
+                raise ValueError('The partial filter must be a JSON object')
+            index_options['partialFilterExpression'] = partial_filter
+        expire_after = options.get('expire_after_seconds')
+        if expire_after not in (None, ''):
+            if len(index_keys) != 1 or index_keys[0][1] not in (1, -1):
+                raise ValueError('A TTL index must be on a single ascending or descending field')
+            index_options['expireAfterSeconds'] = int(expire_after)
+        if options.get('case_insensitive'):
+            index_options['collation'] = {'locale': options.get('locale') or 'en', 'strength': 2}
+        return index_keys, index_options
+
+    def create_index(self, database_name: str, collection_name: str, keys: List,
+                     options: Optional[Dict] = None) -> Dict:
+        """
+        Start an index build as a background job and return its job id.
+        keys is [[field, 1 | -1 | 'text' | 'hashed' | '2dsphere' | '2d'], ...]; options may set name,
+        unique, sparse, partial_filter (JSON), expire_after_seconds (TTL) and case_insensitive
+        (with locale) for a strength 2 collation. Progress comes from get_index_builds().
+        """
+        try:
+            index_keys, index_options = self._index_spec(keys, options or {})
+        except ValueError as e:
+            return {'success': False, 'message': str(e)}
+        
+        namespace = f'{database_name}.{collection_name}'
+        name = index_options['name']
+        job_id = jobs.submit('index_build', f'Build index {name} on {namespace}',
+                             self._run_index_build, database_name, collection_name, index_keys, index_options,
+                             info={'connection': self.connection['name'], 'namespace': namespace, 'index_name': name})
+        return {'success': True, 'job_id': job_id, 'name': name}
+
+    def _run_index_build(self, database_name: str, collection_name: str, keys: List, options: Dict) -> str:
+        """Job body: createIndexes blocks until the server has finished the build"""
+        client = MongoDBClient(self.connection)
+        if not client.connect():
+            raise RuntimeError(client.connect_error or 'Could not connect')
+        with client_registry.in_use(self.connection['name']):
+            name = client.client[database_name][collection_name].create_index(keys, **options)
+        index_cache.invalidate_prefix((self.connection['name'], database_name, collection_name))
+        return name
+
+    def get_index_builds(self, database_name: str, collection_name: str) -> Dict:
+        """
+        Index build jobs started from the app for a collection, plus the builds in progress on
+        the server (from currentOp, so builds started elsewhere show up too) with done / total.
+        """
+        namespace = f'{database_name}.{collection_name}'
+        build_jobs = jobs.list('index_build', connection=self.connection['name'], namespace=namespace)
+        in_progress = {}
+        try:
+            if self.connect():
+                ops = self.client.admin.command(
+                    {'currentOp': True, 'command.createIndexes': collection_name}).get('inprog', [])
+                for op in ops:
+                    if not str(op.get('ns', '')).startswith(database_name + '.'):
+                        continue
+                    names = tuple(spec.get('name') for spec in op.get('command', {}).get('indexes', []))
+                    progress = op.get('progress') or {}
+                    # The client's createIndexes op and the builder thread both match; keep the one with progress
+                    if names in in_progress and not progress:
+                        continue
+                    in_progress[names] = {
+                        'opid': op.get('opid'),
+                        'indexes': list(names),
+                        'done': progress.get('done'),
+                        'total': progress.get('total'),
+                        'message': op.get('msg', ''),
+                        'seconds_running': op.get('secs_running')
+                    }
+        except Exception as e:
+            print(f"Error reading index build progress: {e}")
+        self.disconnect()
+        return {'success': True, 'jobs': build_jobs, 'in_progress': list(in_progress.values())}
+
+    def drop_index(self, database_name: str, collection_name: str, index_name: str) -> Dict:
+        """Drop an index (dropping an index that is still building aborts the build)"""
+        if index_name == '_id_':
+            return {'success': False, 'message': 'The _id index cannot be dropped'}
+        try:
+            if not self.connect():
+                return {'success': False, 'message': 'Could not connect'}
+            
+            self.client[database_name][collection_name].drop_index(index_name)
+            index_cache.invalidate_prefix((self.connection['name'], database_name, collection_name))
+            
+            self.disconnect()
+            return {'success': True, 'message': f'Dropped index {index_name}'}
+            
+        except Exception as e:
+            self.disconnect()
+            return {'success': False, 'message': f'Error: {str(e)}'}
+
+    def _parse_pipeline(self, pipeline) -> List[Dict]:
+        """Pipeline from the editor (extended JSON text or a list) as a list of stages"""
+        if isinstance(pipeline, str):
+            pipeline = json_util.loads(pipeline) if pipeline.strip() else []
+        if isinstance(pipeline, dict):
+            pipeline = [pipeline]
+        if not isinstance(pipeline, list) or not all(
+                isinstance(stage, dict) and len(stage) == 1 and str(next(iter(stage))).startswith('$')
+                for stage in pipeline):
+            raise ValueError('the pipeline must be a JSON array of stages like [{"$match": {...}}]')
+        return pipeline
+
+    def _pipeline_output(self, database_name: str, pipeline: List[Dict]) -> Optional[Tuple[str, str]]:
+        """(database, collection) written by a final $out / $merge stage, if any"""
+        if not pipeline:
+            return None
+        stage = pipeline[-1]
+        if '$out' in stage:
+            target = stage['$out']
+        elif '$merge' in stage:
+            target = stage['$merge']
+            target = target.get('into') if isinstance(target, dict) else target
+        else:
+            return None
+        if isinstance(target, str):
+            return database_name, target
+        if isinstance(target, dict) and target.get('coll'):
+            return target.get('db', database_name), target['coll']
+        return None
+
+    def run_aggregation(self, database_name: str, collection_name: str, pipeline,
+                        max_time_ms: int = AGGREGATE_MAX_TIME_MS, allow_disk_use: bool = True,
+                        batch_size: int = 100) -> Dict:
+        """
+        Run a pipeline with allowDiskUse / maxTimeMS and return its first batch (columnar).
+        The cursor stays open as a cursor session; further batches come from fetch_cursor_batch().
+        """
+        try:
+            stages = self._parse_pipeline(pipeline)
+        except (ValueError, TypeError) as e:
+            return {'success': False, 'message': f'Invalid pipeline: {str(e)}'}
+        try:
+            if not self.connect():
+                return {'success': False, 'message': 'Could not connect'}
             
-            # Convert ObjectId to string
-            for doc in documents:
-                if '_id' in doc:
-                    doc['_id'] = str(doc['_id'])
+            collection = self.client[database_name][collection_name]
+            options = {'allowDiskUse': bool(allow_disk_use), 'batchSize': batch_size}
+            if max_time_ms:
+                options['maxTimeMS'] = int(max_time_ms)
+            started = time.monotonic()
+            cursor = collection.aggregate(stages, **options)
+            output = self._pipeline_output(database_name, stages)
+            if output:
+                self._invalidate_collection_caches(*output)
+            session_id = cursor_sessions.open(cursor, {
+                'connection': self.connection['name'],
+                'namespace': f'{database_name}.{collection_name}',
+                'kind': 'aggregate',
+            }, on_close=client_registry.pin(self.connection['name']))
             
             self.disconnect()
-            return {'success': True, 'data': documents, 'total': total}
+            result = fetch_cursor_batch(session_id, batch_size)
+            result['first_batch_ms'] = int((time.monotonic() - started) * 1000)
+            return result
             
         except Exception as e:
             self.disconnect()
             return {'success': False, 'message': f'Error: {str(e)}'}
+
+    def explain_aggregation(self, database_name: str, collection_name: str, pipeline,
+                            max_time_ms: int = AGGREGATE_MAX_TIME_MS, allow_disk_use: bool = True) -> Dict:
+        """
+        Per-stage timing of a pipeline from explain at executionStats verbosity (this runs the
+        pipeline). Pipelines ending in $out / $merge can only be planned, so they get no timings.
+        """
+        try:
+            stages = self._parse_pipeline(pipeline)
+        except (ValueError, TypeError) as e:
+            return {'success': False, 'message': f'Invalid pipeline: {str(e)}'}
+        try:
+            if not self.connect():
+                return {'success': False, 'message': 'Could not connect'}
             
+            aggregate_command = {'aggregate': collection_name, 'pipeline': stages, 'cursor': {},
+                                 'allowDiskUse': bool(allow_disk_use)}
+            if max_time_ms:
+                aggregate_command['maxTimeMS'] = int(max_time_ms)
+            timed = self._pipeline_output(database_name, stages) is None
+            verbosity = 'executionStats' if timed else 'queryPlanner'
+            output = self.client[database_name].command('explain', aggregate_command, verbosity=verbosity)
+            
+            self.disconnect()
+            return {'success': True, 'timed': timed, **summarize_aggregate_explain(output)}
+            
+        except Exception as e:
+            self.disconnect()
+            return {'success': False, 'message': f'Error: {str(e)}'}
+
     def get_document(self, database_name: str, collection_name: str, document_id: str) -> Dict:
         """Get single document by _id"""
         from bson.objectid import ObjectId
@@ -358,6 +1345,7 @@ class MongoDBClient:
                 del update_data["_id"]
             
             result = collection.replace_one({"_id": query_id}, update_data)
+            self._invalidate_collection_caches(database_name, collection_name)
             print(f"[DEBUG] update_document: replaced! matched={result.matched_count}, modified={result.modified_count}")
             
             self.disconnect()
@@ -401,6 +1389,7 @@ class MongoDBClient:
                 {"_id": query_id},
                 {"$set": {field_key: field_value}}
             )
+            self._invalidate_collection_caches(database_name, collection_name)
             
             self.disconnect()
             
@@ -433,6 +1422,7 @@ class MongoDBClient:
                 {"_id": query_id},
                 {"$unset": {field_key: ""}}
             )
+            self._invalidate_collection_caches(database_name, collection_name)
 
             self.disconnect()
 
@@ -459,6 +1449,7 @@ class MongoDBClient:
             collection = db[collection_name]
             
             result = collection.delete_many({})
+            self._invalidate_collection_caches(database_name, collection_name)
             
             self.disconnect()
             return {
@@ -484,6 +1475,8 @@ class MongoDBClient:
                     return {'success': False, 'message': f'Collection "{collection_name}" already exists in database "{database_name}"'}
             
             db.create_collection(collection_name)
+            self._invalidate_collection_caches(database_name, collection_name)
+            database_list_cache.invalidate(self.connection['name'])
             
             self.disconnect()
             return {'success': True, 'message': f'Database "{database_name}" created with collection "{collection_name}"'}
@@ -508,6 +1501,9 @@ class MongoDBClient:
             for name in collection_names:
                 try:
                     db.drop_collection(name)
+                    self._invalidate_collection_caches(database_name, name)
+                    # Dropping the last collection drops the database
+                    database_list_cache.invalidate(self.connection['name'])
                     dropped.append(name)
                 except Exception as e:
                     errors.append(f'{name}: {str(e)}')
@@ -531,6 +1527,120 @@ class MongoDBClient:
             self.disconnect()
             return {'success': False, 'message': f'Error: {str(e)}'}
     
+    def copy_collection(self, database_name: str, collection_name: str, target_database: str,
+                        target_collection: str, target_connection: Optional[Dict] = None,
+                        copy_indexes: bool = True, replace: bool = False) -> Dict:
+        """
+        Start copying a collection, on this connection or into another one, as a background job
+        and return its job id. A target that already holds documents is refused unless replace
+        is set, in which case it is swapped for the copy once the copy has finished.
+        """
+        target_database = (target_database or '').strip()
+        target_collection = (target_collection or '').strip()
+        if not target_database or not target_collection:
+            return {'success': False, 'message': 'Target database and collection are required'}
+        target_connection = target_connection or self.connection
+        source = f'{database_name}.{collection_name}'
+        target = f'{target_database}.{target_collection}'
+        same_server = (target_connection['name'] == self.connection['name']
+                       or _server_address(target_connection) == _server_address(self.connection))
+        if same_server and source == target:
+            return {'success': False, 'message': 'Source and target are the same collection'}
+        
+        try:
+            if not self.connect():
+                return {'success': False, 'message': 'Could not connect'}
+            target_client = MongoDBClient(target_connection)
+            if not target_client.connect():
+                return {'success': False, 'message': 'Could not connect to the target'}
+            # Catches the same server reached under another host name
+            source_uuid = _collection_uuid(self.client[database_name], collection_name)
+            if source_uuid is not None and source_uuid == _collection_uuid(target_client.client[target_database],
+                                                                          target_collection):
+                return {'success': False, 'message': 'Source and target are the same collection'}
+            existing = target_client.client[target_database][target_collection].find_one({}, {'_id': 1})
+            target_client.disconnect()
+            self.disconnect()
+            if existing is not None and not replace:
+                return {'success': False, 'message': f'Collection {target} already contains data'}
+        except Exception as e:
+            self.disconnect()
+            return {'success': False, 'message': f'Error: {str(e)}'}
+        
+        job_id = jobs.submit('copy', f'Copy {source} to {target_connection["name"]}/{target}',
+                             self._run_copy, database_name, collection_name, target_connection,
+                             target_database, target_collection, copy_indexes, replace,
+                             info={'connection': self.connection['name'], 'namespace': source,
+                                   'target': f'{target_connection["name"]}/{target}'})
+        return {'success': True, 'job_id': job_id}
+
+    def _run_copy(self, database_name: str, collection_name: str, target_connection: Dict,
+                  target_database: str, target_collection: str, copy_indexes: bool, replace: bool) -> Dict:
+        """
+        Job body. The source is read with find_raw_batches and each batch is split into
+        RawBSONDocuments for insert_many, which sends their bytes as they are, so nothing is
+        decoded into dicts and encoded again. The copy is written to a staging collection
+        created with the source's options and renamed over the target at the end, so a failed
+        copy leaves the target as it was. An index that cannot be built is reported in
+        index_errors rather than failing the copy.
+        """
+        source_client = MongoDBClient(self.connection)
+        target_client = MongoDBClient(target_connection)
+        if not source_client.connect():
+            raise RuntimeError(source_client.connect_error or 'Could not connect')
+        if not target_client.connect():
+            raise RuntimeError(target_client.connect_error or 'Could not connect to the target')
+        
+        with client_registry.in_use(self.connection['name']), client_registry.in_use(target_connection['name']):
+            source = source_client.client[database_name][collection_name]
+            # Collation, validator, capped size, clusteredIndex, ... of the source
+            listed = next(source_client.client[database_name].list_collections(
+                filter={'name': collection_name}), None)
+            # A view is copied as a plain collection of its documents
+            options = dict(listed.get('options', {})) if listed and listed.get('type') != 'view' else {}
+            target_db = target_client.client[target_database]
+            staging = target_db.create_collection(f'{target_collection}.khaan_copy_{uuid.uuid4().hex[:8]}',
+                                                  **options)
+            try:
+                copied = 0
+                raw_options = CodecOptions(document_class=RawBSONDocument)
+                for data in source.find_raw_batches({}, batch_size=COPY_BATCH_SIZE):
+                    batch = bson.decode_all(data, raw_options)
+                    if batch:
+                        copied += len(staging.insert_many(batch, ordered=False,
+                                                          bypass_document_validation=True).inserted_ids)
+                
+                indexes = []
+                index_errors = []
+                if copy_indexes:
+                    for spec in source.list_indexes():
+                        if spec['name'] == '_id_':
+                            continue
+                        spec = {key: value for key, value in spec.items() if key not in INDEX_SPEC_SKIP}
+                        try:
+                            target_db.command('createIndexes', staging.name, indexes=[spec])
+                            indexes.append(spec['name'])
+                        except Exception as e:
+                            index_errors.append({'name': spec['name'], 'error': str(e)})
+                
+                # An empty target is replaced too; one that got documents meanwhile makes the rename fail
+                drop_target = replace or target_db[target_collection].find_one({}, {'_id': 1}) is None
+                staging.rename(target_collection, dropTarget=drop_target)
+            except Exception:
+                staging.drop()
+                raise
+        
+        target_client._invalidate_collection_caches(target_database, target_collection)
+        database_list_cache.invalidate(target_connection['name'])
+        return {'copied': copied, 'indexes': indexes, 'index_errors': index_errors}
+
+    def get_copy_job(self, job_id: str) -> Dict:
+        """Status of a copy job started from this connection"""
+        job = jobs.get(job_id)
+        if not job or job['kind'] != 'copy' or job.get('connection') != self.connection['name']:
+            return {'success': False, 'message': 'Copy job not found'}
+        return {'success': True, 'job': job}
+
     def import_collection(self, database_name: str, collection_name: str, documents: list) -> Dict:
         """Import data from JSON into new collection"""
         try:
@@ -547,6 +1657,9 @@ class MongoDBClient:
                 documents = [documents]
             
             result = collection.insert_many(documents)
+            self._invalidate_collection_caches(database_name, collection_name)
+            # The import may have created the database
+            database_list_cache.invalidate(self.connection['name'])
             
             self.disconnect()
             
@@ -560,12 +1673,16 @@ class MongoDBClient:
             self.disconnect()
             return {'success': False, 'message': f'Error: {str(e)}'}
 
-    def export_collections(self, database_name: str, collection_names: List[str], export_dir: str) -> Dict:
-        """Export collections to JSON files"""
-        from bson import json_util
-        import json
-        import os
-        
+    def export_collections(self, database_name: str, collection_names: List[str], export_dir: str,
+                           export_format: str = 'json', partitions: int = 0, merge_parts: bool = True,
+                           compression: str = '') -> Dict:
+        """
+        Export collections to files, streamed batch by batch (see export_engine) as 'json',
+        'ndjson', 'csv' (columns from the inferred schema) or 'bson' (with mongorestore
+        metadata), optionally compressed ('gzip' / 'zstd'). partitions > 1 reads each collection
+        as that many _id ranges on parallel cursors, merged into one file in _id order or
+        (merge_parts=False) kept as numbered part files.
+        """
         try:
             if not self.connect():
                 return {'success': False, 'message': 'Could not connect'}
@@ -576,29 +1693,39 @@ class MongoDBClient:
             if not os.path.exists(export_dir):
                 return {'success': False, 'message': f'Destination folder not found: {export_dir}'}
             
-            db = self.client[database_name]
-            results = []
-            errors = []
+            if export_format not in EXPORT_WRITERS:
+                return {'success': False, 'message': f'Unknown export format: {export_format}'}
+            compression = compression or None
+            try:
+                check_compression(compression)
+            except ValueError as e:
+                return {'success': False, 'message': str(e)}
             
-            for name in collection_names:
-                try:
-                    collection = db[name]
-                    documents = list(collection.find())
-                    
-                    if not documents:
-                        errors.append(f'{name}: No data in collection')
-                        continue
-                        
-                    file_path = os.path.join(export_dir, f"{name}.json")
-                    
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        # Use json_util.dumps for BSON types (ObjectId, datetime)
-                        json_str = json_util.dumps(documents, indent=4, ensure_ascii=False)
-                        f.write(json_str)
-                        
-                    results.append(name)
-                except Exception as e:
-                    errors.append(f'{name}: {str(e)}')
+            db = self.client[database_name]
+            # Collections run side by side; the engine caps open cursors across all of them
+            workers = int(self.connection.get('export_workers') or EXPORT_WORKERS)
+            
+            def export_one(name: str) -> int:
+                collection = db[name]
+                writer_options = {}
+                if export_format == 'csv':
+                    schema = schema_inference.infer((self.connection['name'], database_name, name), collection)
+                    writer_options['columns'] = csv_columns(schema['schema'])
+                path = export_path(export_dir, name, export_format, compression)
+                if partitions and int(partitions) > 1:
+                    count = export_partitioned(collection, path, export_format, int(partitions), workers, merge_parts,
+                                               compression, writer_options)
+                else:
+                    count = export_collection(collection, path, export_format, compression=compression,
+                                              writer_options=writer_options)
+                if export_format == 'bson':
+                    write_bson_metadata(collection, export_dir, name, compression)
+                return count
+            
+            with client_registry.in_use(self.connection['name']):
+                outcomes = run_exports(collection_names, export_one, workers)
+            results = [name for name, (ok, _) in outcomes.items() if ok]
+            errors = [f'{name}: {error}' for name, (ok, error) in outcomes.items() if not ok]
             
             self.disconnect()
             
@@ -617,4 +1744,29 @@ class MongoDBClient:
             
         except Exception as e:
             self.disconnect()
-            return {'success': False, 'message': f'Error: {str(e)}'}
\ No newline at end of file
+            return {'success': False, 'message': f'Error: {str(e)}'}
+
+
+def fetch_cursor_batch(session_id: str, batch_size: int = 100) -> Dict:
+    """Next batch of an open cursor session in the columnar grid format"""
+    try:
+        documents, exhausted = cursor_sessions.next_batch(session_id, batch_size)
+        return {
+            'success': True,
+            'session_id': '' if exhausted else session_id,
+            'exhausted': exhausted,
+            **to_columnar(documents)
+        }
+    except CursorSessionExpired:
+        return {'success': False, 'expired': True, 'message': 'Scroll session expired, reload the view'}
+    except Exception as e:
+        cursor_sessions.close(session_id)
+        return {'success': False, 'message': f'Error: {str(e)}'}
+
+
+def close_cursor_sessions(session_ids: List[str]) -> Dict:
+    """Close cursor sessions a view no longer needs"""
+    for session_id in session_ids or []:
+        if session_id:
+            cursor_sessions.close(session_id)
+    return {'success': True}
@@ -0,0 +1,26 @@
+"""
+Blocking Call Executor
+Run blocking pymongo work on a bounded OS thread pool so the eel/gevent hub stays responsive.
+"""
+
+import functools
+from typing import Callable
+from gevent.threadpool import ThreadPool
+
+# Upper bound on MongoDB calls running at the same time for the UI
+DB_WORKERS = 8
+
+_db_pool = ThreadPool(DB_WORKERS)
+
+
+def run_blocking(func: Callable, *args, **kwargs):
+    """Run func on the pool; only the calling greenlet waits, other eel calls keep running"""
+    return _db_pool.apply(func, args, kwargs)
+
+
+def offload(func: Callable) -> Callable:
+    """Decorator for eel handlers whose whole body is blocking MongoDB work"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return run_blocking(func, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,463 @@
+"""
+Export Engine
+Stream a collection to a file one cursor batch at a time, so memory stays flat at any size.
+"""
+
+import csv
+import datetime
+import gzip
+import io
+import os
+import shutil
+import struct
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import bson
+from bson import Int64, ObjectId, json_util
+from pymongo.errors import OperationFailure
+
+EXPORT_BATCH_SIZE = 1000
+# Encoded documents are collected in a write buffer of this size before each disk write
+EXPORT_BUFFER_SIZE = 1024 * 1024
+# Collections exported at the same time by one export; a connection can override it
+# with 'export_workers' in config.json
+EXPORT_WORKERS = 4
+# Server cursors open at once across every running export
+MAX_EXPORT_CURSORS = 8
+_cursor_slots = threading.BoundedSemaphore(MAX_EXPORT_CURSORS)
+# _id values sampled per partition to place the range boundaries
+PARTITION_SAMPLES = 100
+MAX_PARTITIONS = 64
+# Compression applied while streaming: name -> file suffix (zstd needs the zstandard package)
+COMPRESSIONS = {'gzip': 'gz', 'zstd': 'zst'}
+
+
+class ExportWriter(ABC):
+    """Encodes documents onto a stream; subclasses set the file format"""
+
+    extension = ''
+    # Binary writers get the raw (possibly compressed) byte stream, others a UTF-8 text stream
+    binary = False
+    # Newline translation of the text stream (None: platform line endings)
+    newline = None
+    # Written between two partial files when they are merged in order
+    joiner = ''
+    # Fed the server's undecoded batches (find_raw_batches) through write_raw_batch instead of write
+    raw_batches = False
+
+    def __init__(self, stream, **options):
+        self.stream = stream
+        self.count = 0
+
+    def begin(self):
+        pass
+
+    @abstractmethod
+    def write(self, document: Dict):
+        """Encode one document onto the stream and count it"""
+
+    def end(self):
+        pass
+
+
+class JsonArrayWriter(ExportWriter):
+    """One pretty-printed JSON array (Extended JSON), byte for byte what json_util.dumps(docs, indent=4) gives"""
+
+    extension = 'json'
+    joiner = ','
+
+    def begin(self):
+        self.stream.write('[')
+
+    def write(self, document: Dict):
+        text = json_util.dumps(document, indent=4, ensure_ascii=False)
+        self.stream.write(',\n' if self.count else '\n')
+        self.stream.write('\n'.join('    ' + line for line in text.split('\n')))
+        self.count += 1
+
+    def end(self):
+        self.stream.write('\n]' if self.count else ']')
+
+
+class NdjsonWriter(ExportWriter):
+    """One Extended JSON document per line, as mongoexport writes and mongoimport reads"""
+
+    extension = 'ndjson'
+    newline = '\n'
+
+    def write(self, document: Dict):
+        self.stream.write(json_util.dumps(document, ensure_ascii=False))
+        self.stream.write('\n')
+        self.count += 1
+
+
+def csv_columns(schema: List[Dict]) -> List[str]:
+    """
+    CSV columns from an inferred schema (see schema_inference): embedded documents are
+    flattened to their dot-path leaves, while arrays stay one column holding JSON.
+    """
+    paths = [field['path'] for field in schema]
+    arrays = [field['path'] + '.' for field in schema if 'array' in field['types']]
+    columns = []
+    for field in schema:
+        path = field['path']
+        if any(path.startswith(prefix) for prefix in arrays):
+            continue
+        has_children = any(other.startswith(path + '.') for other in paths)
+        if has_children and set(field['types']) <= {'object', 'null'}:
+            continue
+        columns.append(path)
+    # An empty collection still gets a header
+    return columns or ['_id']
+
+
+def _csv_cell(value: Any) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json_util.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def _dot_get(document: Dict, path: str) -> Any:
+    value = document
+    for part in path.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+class CsvWriter(ExportWriter):
+    """Flattened dot-path columns; fields missing from the column list are not exported"""
+
+    extension = 'csv'
+    # The csv module writes its own \r\n line endings
+    newline = ''
+
+    def __init__(self, stream, columns: Optional[List[str]] = None, **options):
+        super().__init__(stream)
+        if not columns:
+            raise ValueError('CSV export needs a column list')
+        self.columns = columns
+        self.csv = csv.writer(stream)
+
+    def begin(self):
+        self.csv.writerow(self.columns)
+
+    def write(self, document: Dict):
+        self.csv.writerow([_csv_cell(_dot_get(document, column)) for column in self.columns])
+        self.count += 1
+
+
+def raw_document_count(data: bytes) -> int:
+    """Documents in concatenated BSON, from their length prefixes alone"""
+    count = position = 0
+    while position < len(data):
+        position += struct.unpack_from('<i', data, position)[0]
+        count += 1
+    return count
+
+
+class BsonWriter(ExportWriter):
+    """
+    Concatenated BSON documents, the .bson file format of mongodump / mongorestore. Batches
+    go to disk as the bytes the server sent, without being decoded into Python objects.
+    """
+
+    extension = 'bson'
+    binary = True
+    raw_batches = True
+
+    def write(self, document: Dict):
+        self.stream.write(bson.encode(document))
+        self.count += 1
+
+    def write_raw_batch(self, data: bytes):
+        self.stream.write(data)
+        self.count += raw_document_count(data)
+
+
+EXPORT_WRITERS = {
+    'json': JsonArrayWriter,
+    'ndjson': NdjsonWriter,
+    'csv': CsvWriter,
+    'bson': BsonWriter,
+}
+
+
+def _writer_class(export_format: str):
+    if export_format not in EXPORT_WRITERS:
+        raise ValueError(f'Unknown export format: {export_format}')
+    return EXPORT_WRITERS[export_format]
+
+
+def check_compression(compression: Optional[str]):
+    """Raise ValueError for an unknown compression or one whose package is not installed"""
+    if not compression:
+        return
+    if compression not in COMPRESSIONS:
+        raise ValueError(f'Unknown compression: {compression}')
+    if compression == 'zstd':
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            raise ValueError('zstd compression needs the zstandard package (pip install zstandard)')
+
+
+def _compressed(raw, compression: Optional[str]):
+    """Wrap a binary stream in a streaming compressor"""
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6)
+    if compression == 'zstd':
+        import zstandard
+        return zstandard.ZstdCompressor(level=3).stream_writer(raw)
+    check_compression(compression)
+    return raw
+
+
+@contextmanager
+def _open_output(path: str, writer_class, compression: Optional[str] = None):
+    """Buffered file stream for a writer: binary or UTF-8 text, compressed on the way"""
+    with ExitStack() as stack:
+        stream = stack.enter_context(open(path, 'wb', buffering=EXPORT_BUFFER_SIZE))
+        if compression:
+            stream = stack.enter_context(_compressed(stream, compression))
+        if not writer_class.binary:
+            stream = stack.enter_context(io.TextIOWrapper(stream, encoding='utf-8', newline=writer_class.newline))
+        yield stream
+
+
+def _suffix(compression: Optional[str]) -> str:
+    return f".{COMPRESSIONS[compression]}" if compression else ''
+
+
+def export_path(directory: str, name: str, export_format: str, compression: Optional[str] = None) -> str:
+    return os.path.join(directory, f"{name}.{_writer_class(export_format).extension}{_suffix(compression)}")
+
+
+def write_bson_metadata(collection, directory: str, name: str, compression: Optional[str] = None):
+    """<name>.metadata.json next to a BSON dump, so mongorestore recreates options and indexes"""
+    metadata = {
+        'options': collection.options(),
+        'indexes': [dict(index) for index in collection.list_indexes()],
+        'collectionName': name,
+        'type': 'collection',
+    }
+    text = json_util.dumps(metadata, json_options=json_util.CANONICAL_JSON_OPTIONS)
+    path = os.path.join(directory, f"{name}.metadata.json{_suffix(compression)}")
+    with ExitStack() as stack:
+        stream = stack.enter_context(open(path, 'wb'))
+        if compression:
+            stream = stack.enter_context(_compressed(stream, compression))
+        stream.write(text.encode('utf-8'))
+
+
+def export_collection(collection, path: str, export_format: str = 'json', query: Optional[Dict] = None,
+                      batch_size: int = EXPORT_BATCH_SIZE, progress: Optional[Callable[[int], None]] = None,
+                      sort: Optional[List] = None, fragment: bool = False, compression: Optional[str] = None,
+                      writer_options: Optional[Dict] = None) -> int:
+    """
+    Write the documents of collection (matching query) to path and return how many were written.
+    The cursor fetches batch_size documents per round trip and each one is encoded on its own,
+    so only one batch and the write buffer are held at a time. The file is written under a
+    temporary name and renamed when complete; nothing is left behind when the export fails.
+    fragment=True leaves out the format's header and footer, for parts merged later.
+    """
+    writer_class = _writer_class(export_format)
+    temp_path = path + '.part'
+    try:
+        with _open_output(temp_path, writer_class, compression) as stream:
+            writer = writer_class(stream, **(writer_options or {}))
+            if not fragment:
+                writer.begin()
+            with _cursor_slots:
+                if writer.raw_batches:
+                    cursor = collection.find_raw_batches(query or {}, batch_size=batch_size)
+                else:
+                    cursor = collection.find(query or {}, batch_size=batch_size)
+                if sort:
+                    cursor = cursor.sort(sort)
+                if writer.raw_batches:
+                    for data in cursor:
+                        writer.write_raw_batch(data)
+                        if progress:
+                            progress(writer.count)
+                else:
+                    for document in cursor:
+                        writer.write(document)
+                        if progress and writer.count % batch_size == 0:
+                            progress(writer.count)
+            if not fragment:
+                writer.end()
+        os.replace(temp_path, path)
+        return writer.count
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _id_type_alias(value: Any) -> Optional[str]:
+    """$type alias of an _id type whose values compare within one type bracket, else None"""
+    if isinstance(value, ObjectId):
+        return 'objectId'
+    if isinstance(value, str):
+        return 'string'
+    if isinstance(value, (int, float, Int64)) and not isinstance(value, bool):
+        return 'number'
+    if isinstance(value, datetime.datetime):
+        return 'date'
+    return None
+
+
+def partition_boundaries(collection, partitions: int) -> List[Any]:
+    """
+    Up to partitions - 1 _id values that split the collection into ranges of similar size.
+    The boundaries come from $bucketAuto over a random sample of _ids (so the collection
+    is not read in full), or from the sorted sample when $bucketAuto is not available.
+    An empty list means the collection cannot be split (too small or mixed _id types).
+    """
+    partitions = min(int(partitions), MAX_PARTITIONS)
+    if partitions < 2:
+        return []
+    sample = [{'$sample': {'size': partitions * PARTITION_SAMPLES}}, {'$project': {'_id': 1}}]
+    try:
+        buckets = list(collection.aggregate(
+            sample + [{'$bucketAuto': {'groupBy': '$_id', 'buckets': partitions}}], allowDiskUse=True))
+        boundaries = [bucket['_id']['min'] for bucket in buckets[1:]]
+    except OperationFailure as e:
+        print(f"Error placing partitions with $bucketAuto, using the sample: {e}")
+        ids = [document['_id'] for document in collection.aggregate(sample, allowDiskUse=True)]
+        try:
+            ids.sort()
+        except TypeError:
+            return []
+        step = len(ids) / partitions
+        boundaries = [ids[int(step * i)] for i in range(1, partitions) if ids]
+    aliases = {_id_type_alias(value) for value in boundaries}
+    if len(aliases) != 1 or None in aliases:
+        return []
+    # Duplicates would give empty ranges
+    return sorted(set(boundaries))
+
+
+def partition_filters(boundaries: List[Any]) -> List[Dict]:
+    """
+    _id range filters covering the collection in _id order. _ids of another type than the
+    boundaries fall outside every range and get a partition of their own at the end.
+    """
+    if not boundaries:
+        return [{}]
+    filters = [{'_id': {'$lt': boundaries[0]}}]
+    for low, high in zip(boundaries, boundaries[1:]):
+        filters.append({'_id': {'$gte': low, '$lt': high}})
+    filters.append({'_id': {'$gte': boundaries[-1]}})
+    filters.append({'_id': {'$not': {'$type': _id_type_alias(boundaries[0])}}})
+    return filters
+
+
+def part_path(path: str, number: int) -> str:
+    """name.json -> name.001.json, name.json.gz -> name.001.json.gz"""
+    suffix = ''
+    for extension in COMPRESSIONS.values():
+        if path.endswith('.' + extension):
+            path, suffix = path[:-len(extension) - 1], '.' + extension
+    base, extension = os.path.splitext(path)
+    return f"{base}.{number:03d}{extension}{suffix}"
+
+
+def export_partitioned(collection, path: str, export_format: str = 'json', partitions: int = 4,
+                       workers: int = EXPORT_WORKERS, merge: bool = True, compression: Optional[str] = None,
+                       writer_options: Optional[Dict] = None) -> int:
+    """
+    Export a collection as _id ranges read on parallel cursors. merge=True writes the parts
+    as uncompressed fragments and joins them in _id order into path, compressing on the way;
+    merge=False keeps them as numbered, self-contained files (name.001.json, ...).
+    Returns the number of documents written.
+    """
+    filters = partition_filters(partition_boundaries(collection, partitions))
+    base_path = path[:-len(_suffix(compression))] if compression else path
+    paths = [part_path(base_path if merge else path, number) for number in range(1, len(filters) + 1)]
+    labels = [str(number) for number in range(len(filters))]
+
+    def export_part(label: str) -> int:
+        index = int(label)
+        return export_collection(collection, paths[index], export_format, query=filters[index],
+                                 sort=[('_id', 1)], fragment=merge, compression=None if merge else compression,
+                                 writer_options=writer_options)
+
+    outcomes = run_exports(labels, export_part, workers=min(int(workers), len(filters)))
+    try:
+        failed = [error for ok, error in outcomes.values() if not ok]
+        if failed:
+            raise RuntimeError(failed[0])
+        counts = [outcomes[label][1] for label in labels]
+        if merge:
+            merge_parts(paths, counts, path, export_format, compression, writer_options)
+        elif len(filters) > 1 and counts[-1] == 0:
+            # The other-types partition is almost always empty
+            os.remove(paths[-1])
+        return sum(counts)
+    finally:
+        if merge or any(not ok for ok, _ in outcomes.values()):
+            for part in paths:
+                if os.path.exists(part):
+                    os.remove(part)
+
+
+def merge_parts(paths: List[str], counts: List[int], path: str, export_format: str,
+                compression: Optional[str] = None, writer_options: Optional[Dict] = None):
+    """Join uncompressed fragment files in order into one complete file of the format"""
+    writer_class = _writer_class(export_format)
+    temp_path = path + '.part'
+    try:
+        with _open_output(temp_path, writer_class, compression) as stream:
+            writer = writer_class(stream, **(writer_options or {}))
+            writer.begin()
+            for part, count in zip(paths, counts):
+                if not count:
+                    continue
+                if writer.count and writer.joiner:
+                    stream.write(writer.joiner)
+                if writer_class.binary:
+                    source = open(part, 'rb')
+                else:
+                    source = open(part, 'r', encoding='utf-8', newline=writer_class.newline)
+                with source:
+                    shutil.copyfileobj(source, stream, EXPORT_BUFFER_SIZE)
+                writer.count += count
+            writer.end()
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def run_exports(names: List[str], export_one: Callable[[str], Any],
+                workers: int = EXPORT_WORKERS) -> Dict[str, Tuple[bool, Any]]:
+    """
+    Run export_one(name) for every name on a pool of worker threads, so one large collection
+    only holds up its own worker. Returns {name: (ok, result or error message)} in input order.
+    """
+    results: Dict[str, Tuple[bool, Any]] = {}
+    if not names:
+        return results
+    with ThreadPoolExecutor(max_workers=max(1, min(int(workers), len(names))),
+                            thread_name_prefix='khaan-export') as pool:
+        futures = {name: pool.submit(export_one, name) for name in names}
+        for name in names:
+            try:
+                results[name] = (True, futures[name].result())
+            except Exception as e:
+                results[name] = (False, str(e))
+    return results
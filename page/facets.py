@@ -0,0 +1,103 @@
+"""
+Facets
+Top values of a field with their counts, for search autocompletion and one-click filters.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from pymongo.errors import ExecutionTimeout
+
+from grid_format import bson_type, to_json_value
+
+FACET_LIMIT = 20
+FACET_MAX_TIME_MS = 5000
+# Documents sampled when grouping the whole collection runs out of time
+FACET_SAMPLE_SIZE = 10000
+
+# Sampled BSON types a one-click filter can rebuild with query_builder.coerce_value
+FILTER_TYPES = {'string': 'string', 'int': 'int', 'long': 'int', 'double': 'double', 'date': 'date',
+                'objectId': 'objectId', 'bool': 'bool'}
+
+
+def facet_value(value: Any, count: int) -> Dict:
+    """A value as shown in the UI, with the condition type and text a filter on it needs (type None: not filterable)"""
+    kind = FILTER_TYPES.get(bson_type(value))
+    if kind == 'bool':
+        text = 'true' if value else 'false'
+    elif kind == 'date':
+        text = value.isoformat()
+    else:
+        text = str(value)
+    return {'value': to_json_value(value), 'text': text, 'type': kind, 'count': count}
+
+
+def facet_pipeline(field: str, limit: int) -> List[Dict]:
+    """Group by the field's values, array elements counted separately like distinct does"""
+    return [
+        {'$project': {'_id': 0, 'value': '$' + field}},
+        {'$unwind': '$value'},
+        {'$group': {'_id': '$value', 'count': {'$sum': 1}}},
+        {'$sort': {'count': -1}},
+        {'$limit': limit},
+    ]
+
+
+def _from_pipeline(collection, pipeline: List[Dict], source: str, approximate: bool,
+                   index_name: Optional[str] = None) -> Dict:
+    options = {'hint': index_name} if index_name else {}
+    results = collection.aggregate(pipeline, maxTimeMS=FACET_MAX_TIME_MS, allowDiskUse=True, **options)
+    return {
+        'values': [facet_value(row['_id'], row['count']) for row in results],
+        'source': source,
+        'approximate': approximate,
+    }
+
+
+def _field_values(document: Dict, field: str) -> List[Any]:
+    """Values of a dot-path in a projected document, array elements one by one"""
+    value = document
+    for part in field.split('.'):
+        if not isinstance(value, dict):
+            return []
+        value = value.get(part)
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _from_unique_index(collection, field: str, limit: int, index_name: str) -> Dict:
+    """The first values in index order, each counted once, read from the unique index's keys"""
+    projection = {field: 1} if field == '_id' else {'_id': 0, field: 1}
+    cursor = (collection.find({field: {'$ne': None}}, projection)
+              .hint(index_name).sort(field, 1).limit(limit).max_time_ms(FACET_MAX_TIME_MS))
+    values = [value for document in cursor for value in _field_values(document, field)]
+    return {
+        'values': [facet_value(value, 1) for value in values[:limit]],
+        'source': 'unique',
+        'approximate': False,
+    }
+
+
+def compute_facets(collection, field: str, limit: int = FACET_LIMIT, index: Optional[tuple] = None) -> Dict:
+    """
+    Top values of field, counted by one $group within FACET_MAX_TIME_MS. With a plain
+    (non-unique) index on the field the pipeline is hinted to it, so it walks index keys
+    (covered unless the index is multikey) under the same counting rule; when the group
+    runs out of time a random sample is grouped instead. Values of a unique index all
+    count once, so its first limit keys are returned in index order.
+    """
+    index_name = None
+    if index:
+        index_name, unique = index
+        if unique:
+            try:
+                return _from_unique_index(collection, field, limit, index_name)
+            except ExecutionTimeout as e:
+                print(f"Error reading values of {field} from {index_name}, grouping instead: {e}")
+
+    pipeline = facet_pipeline(field, limit)
+    try:
+        return _from_pipeline(collection, pipeline, 'index' if index_name else 'aggregate', False, index_name)
+    except ExecutionTimeout as e:
+        print(f"Error grouping values of {field}, sampling instead: {e}")
+        return _from_pipeline(collection, [{'$sample': {'size': FACET_SAMPLE_SIZE}}] + pipeline, 'sample', True)
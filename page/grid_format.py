@@ -0,0 +1,170 @@
+"""
+Grid Format
+Server-side shaping of data grid pages so only what the table displays is sent.
+"""
+
+import datetime
+import math
+from typing import Dict, List, Optional
+from bson import Binary, Decimal128, Int64, ObjectId
+
+# BSON types the grid shows as a placeholder instead of their content
+PLACEHOLDER_TYPES = ["object", "binData", "javascript", "javascriptWithScope", "dbPointer"]
+
+
+def _preview_value(value: str, preview_length: int) -> Dict:
+    """Aggregation expression that shrinks one field value for display"""
+    return {
+        "$let": {
+            "vars": {"t": {"$type": value}},
+            "in": {
+                "$switch": {
+                    "branches": [
+                        {
+                            # One extra code point lets the caller tell the value was cut
+                            "case": {"$eq": ["$$t", "string"]},
+                            "then": {"$substrCP": [value, 0, preview_length + 1]},
+                        },
+                        {
+                            "case": {"$eq": ["$$t", "array"]},
+                            "then": {"_preview": "array", "length": {"$size": value}},
+                        },
+                        {
+                            "case": {"$in": ["$$t", PLACEHOLDER_TYPES]},
+                            "then": {"_preview": "$$t"},
+                        },
+                    ],
+                    "default": value,
+                }
+            },
+        }
+    }
+
+
+def build_preview_stages(columns: Optional[List[str]], preview_length: int) -> List[Dict]:
+    """
+    Pipeline stages appended after $match/$sort/$limit for the grid:
+    - keep only the requested top-level columns (plus _id), when given
+    - cut strings to preview_length and replace arrays/objects/binary with a small marker;
+      _id is passed through whole, since paging tokens and edits are built from it
+    """
+    stages = []
+    if columns:
+        projection = {"_id": 1}
+        for column in columns:
+            if column and not column.startswith("$") and "." not in column:
+                projection[column] = 1
+        stages.append({"$project": projection})
+    if preview_length and preview_length > 0:
+        stages.append({
+            "$replaceRoot": {
+                "newRoot": {
+                    "$mergeObjects": [
+                        {"_id": "$_id"},
+                        {
+                            "$arrayToObject": {
+                                "$map": {
+                                    "input": {
+                                        "$filter": {
+                                            "input": {"$objectToArray": "$$ROOT"},
+                                            "cond": {"$ne": ["$$this.k", "_id"]},
+                                        }
+                                    },
+                                    "in": {"k": "$$this.k", "v": _preview_value("$$this.v", preview_length)},
+                                }
+                            }
+                        },
+                    ]
+                }
+            }
+        })
+    return stages
+
+
+def bson_type(value) -> str:
+    """Short type tag of a value as sent to the browser"""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, Int64):
+        return "long"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "double"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, ObjectId):
+        return "objectId"
+    if isinstance(value, datetime.datetime):
+        return "date"
+    if isinstance(value, Decimal128):
+        return "decimal"
+    if isinstance(value, (bytes, Binary)):
+        return "binData"
+    if isinstance(value, list):
+        return "array"
+    if isinstance(value, dict):
+        # Placeholder produced by build_preview_stages
+        return value.get("_preview", "object") if isinstance(value.get("_preview"), str) else "object"
+    return type(value).__name__
+
+
+def to_json_value(value):
+    """Convert BSON values the eel JSON encoder cannot handle (it would send null)"""
+    if isinstance(value, float) and not math.isfinite(value):
+        return str(value)
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    if isinstance(value, (bytes, Binary)):
+        return {"_preview": "binData"}
+    if isinstance(value, list):
+        return [to_json_value(item) for item in value]
+    if isinstance(value, dict):
+        return {key: to_json_value(item) for key, item in value.items()}
+    return str(value)
+
+
+def to_columnar(documents: List[Dict]) -> Dict:
+    """
+    Columnar page: field names once in 'columns', one array per document in 'rows',
+    and one type tag per column in 'types' ('mixed' when documents disagree).
+    Columns are the union over all documents, _id first, then in first-seen order.
+    """
+    columns: List[str] = []
+    seen = set()
+    for doc in documents:
+        for key in doc:
+            if key not in seen:
+                seen.add(key)
+                columns.append(key)
+    if "_id" in seen:
+        columns.remove("_id")
+        columns.insert(0, "_id")
+
+    column_types = {column: set() for column in columns}
+    rows = []
+    for doc in documents:
+        row = []
+        for column in columns:
+            if column in doc:
+                value = doc[column]
+                column_types[column].add(bson_type(value))
+                row.append(to_json_value(value))
+            else:
+                row.append(None)
+        rows.append(row)
+
+    types = []
+    for column in columns:
+        found = column_types[column] - {"null"}
+        if not found:
+            types.append("null")
+        elif len(found) == 1:
+            types.append(found.pop())
+        else:
+            types.append("mixed")
+    return {"columns": columns, "rows": rows, "types": types}
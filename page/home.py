@@ -8,7 +8,9 @@ if sys.stderr is None:
     sys.stderr = open(os.devnull, "w", encoding="utf-8")
 
 import eel
-from database_manager import MongoDBConnectionManager, MongoDBClient
+from database_manager import MongoDBConnectionManager, MongoDBClient, fetch_cursor_batch as _fetch_cursor_batch, \
+    close_cursor_sessions as _close_cursor_sessions
+from executor import offload, run_blocking
 
 
 # Configure Eel
@@ -57,6 +59,7 @@ def delete_connection(name: str):
 
 
 @eel.expose
+@offload
 def test_connection(name: str):
     """Test MongoDB connection"""
     try:
@@ -81,6 +84,7 @@ def test_connection(name: str):
 
 
 @eel.expose
+@offload
 def use_connection(name: str):
     """Use connection and navigate to main page"""
     try:
@@ -90,7 +94,7 @@ def use_connection(name: str):
             return {'success': False, 'message': 'Connection not found'}
         
         client = MongoDBClient(connection)
-        result = client.test_connection()
+        result = client.test_connection(force=False)
         
         if result['success']:
             return {
@@ -106,8 +110,9 @@ def use_connection(name: str):
 
 
 @eel.expose
-def get_databases(connection_name: str):
-    """Get list of all databases"""
+@offload
+def get_databases(connection_name: str, refresh: bool = False):
+    """Get list of all databases with their sizes"""
     try:
         connection = connection_manager.get_connection(connection_name)
         
@@ -115,15 +120,17 @@ def get_databases(connection_name: str):
             return {'success': False, 'message': 'Connection not found'}
         
         client = MongoDBClient(connection)
-        return client.list_databases()
+        return client.list_databases(refresh)
         
     except Exception as e:
         return {'success': False, 'message': f'Error: {str(e)}'}
 
 
 @eel.expose
-def get_collections(connection_name: str, database_name: str):
-    """Get list of collections in database"""
+@offload
+def get_collections(connection_name: str, database_name: str, name_filter: str = "", page: int = 1,
+                    page_size: int = 0):
+    """Get list of collections in database (optionally filtered and paged)"""
     try:
         connection = connection_manager.get_connection(connection_name)
         
@@ -131,17 +138,79 @@ def get_collections(connection_name: str, database_name: str):
             return {'success': False, 'message': 'Connection not found'}
         
         client = MongoDBClient(connection)
-        return client.get_collections(database_name)
+        return client.get_collections(database_name, name_filter, page, page_size)
         
     except Exception as e:
         return {'success': False, 'message': f'Error: {str(e)}'}
 
 
 @eel.expose
+@offload
 def get_collection_data(connection_name: str, database_name: str, collection_name: str, limit: int = 50,
                         skip: int = 0,
-                        search_field: str = "", search_operator: str = "", search_value: str = ""):
-    """Get collection data with optional search and pagination"""
+                        search_field: str = "", search_operator: str = "", search_value: str = "",
+                        cursor_token: str = "", direction: str = "", count_mode: str = "auto",
+                        columns: list = None, preview_length: int = 0, wire_format: str = "documents",
+                        sort_spec: list = None, allow_disk_use: bool = False, confirm_unindexed_sort: bool = False,
+                        prefetch: str = "", conditions: list = None, combinator: str = "and",
+                        refresh: bool = False):
+    """Get collection data with optional search and pagination (keyset when cursor_token is given)"""
+    try:
+        connection = connection_manager.get_connection(connection_name)
+        
+        if not connection:
+            return {'success': False, 'message': 'Connection not found'}
+        
+        client = MongoDBClient(connection)
+        return client.get_collection_data(database_name, collection_name, limit, skip, search_field, search_operator, search_value,
+                                          cursor_token, direction, count_mode, columns, preview_length,
+                                          wire_format, sort_spec, allow_disk_use, confirm_unindexed_sort, prefetch,
+                                          conditions, combinator, refresh)
+        
+    except Exception as e:
+        return {'success': False, 'message': f'Error: {str(e)}'}
+
+
+@eel.expose
+@offload
+def count_collection_documents(connection_name: str, database_name: str, collection_name: str,
+                               search_field: str = "", search_operator: str = "", search_value: str = "",
+                               conditions: list = None, combinator: str = "and"):
+    """Exact document count for a search, requested after the page is shown"""
+    try:
+        connection = connection_manager.get_connection(connection_name)
+        
+        if not connection:
+            return {'success': False, 'message': 'Connection not found'}
+        
+        client = MongoDBClient(connection)
+        return client.count_documents(database_name, collection_name, search_field, search_operator, search_value,
+                                      conditions, combinator)
+        
+    except Exception as e:
+        return {'success': False, 'message': f'Error: {str(e)}'}
+
+@eel.expose
+@offload
+def get_field_index_support(connection_name: str, database_name: str, collection_name: str, field: str):
+    """Search operators that can use an index on a field"""
+    try:
+        connection = connection_manager.get_connection(connection_name)
+        
+        if not connection:
+            return {'success': False, 'message': 'Connection not found'}
+        
+        client = MongoDBClient(connection)
+        return client.get_field_index_support(database_name, collection_name, field)
+        
+    except Exception as e:
+        return {'success': False, 'message': f'Error: {str(e)}'}
+
+@eel.expose
+@offload
+def get_field_facets(connection_name: str, database_name: str, collection_name: str, field: str,
+                     limit: int = 20, refresh: bool = False):
+    """Get the most frequent values of a field with their counts"""
     try:
         connection = connection_manager.get_connection(connection_name)
         
@@ -149,12 +218,210 @@ def get_collection_data(connection_name: str, database_name: str, collection_nam
             return {'success': False, 'message': 'Connection not found'}
         
         client = MongoDBClient(connection)
-        return client.get_collection_data(database_name, collection_name, limit, skip, search_field, search_operator, search_value)
+        return client.get_field_facets(database_name, collection_name, field, limit, refresh)
         
     except Exception as e:
         return {'success': False, 'message': f'Error: {str(e)}'}
 
+
 @eel.expose
+@offload
+def explain_collection_query(connection_name: str, database_name: str, collection_name: str,
+                             search_field: str = "", search_operator: str = "", search_value: str = "",
+                             conditions: list = None, combinator: str = "and", sort_spec: list = None,
+                             columns: list = None, limit: int = 50, skip: int = 0,
+                             verbosity: str = "queryPlanner"):
+    """Explain the data view query (winning plan, index, keys / docs examined)"""
+    try:
+        connection = connection_manager.get_connection(connection_name)
+        
+        if not connection:
+            return {'success': False, 'message': 'Connection not found'}
+        
+        client = MongoDBClient(connection)
+        return client.explain_query(database_name, collection_name, search_field, search_operator, search_value,
+                                    conditions, combinator, sort_spec, columns, limit, skip, verbosity)
+        
+    except Exception as e:
+        return {'success': False, 'message': f'Error: {str(e)}'}
+
+@eel.expose
+@offload
+def get_indexes(connection_name: str, database_name: str, collection_name: str):
+    """List indexes with size and usage"""
+    try:
+        connection = connection_manager.get_connection(connection_name)
+        
+        if not connection:
+            return {'success': False, 'message': 'Connection not found'}
+        
+        client = MongoDBClient(connection)
+        return client.get_indexes(database_name, collection_name)
+        
+    except Exception as e:
+        return {'success': False, 'message': f'Error: {str(e)}'}
+
+@eel.expose
+@offload
+def create_index(connection_name: str, database_name: str, collection_name: str, keys: list, options: dict = None):
+    """Start an index build job"""
+    try:
+        connection = connection_manager.get_connection(connection_name)
+        
+        if not connection:
+            return {'success': False, 'message': 'Connection not found'}
+        
+        client = MongoDBClient(connection)
+        return client.create_index(database_name, collection_name, keys, options)
+        
+    except Exception as e:
+        return {'success': False, 'message': f'Error: {str(e)}'}
+
+@eel.expose
+@offload
+def copy_collection(connection_name: str, database_name: str, collection_name: str, target_database: str,
+                    target_collection: str, target_connection_name: str = '', copy_indexes: bool = True,
+                    replace: bool = False):
+    """Start a collection copy job, optionally into another saved connection"""
+    try:
+        connection = connection_manager.get_connection(connection_name)
+        
+        if not connection:
+            return {'success': False, 'message': 'Connection not found'}
+        
+        target_connection = connection
+        if target_connection_name and target_connection_name != connection_name:
+            target_connection = connection_manager.get_connection(target_connection_name)
+            if not target_connection:
+                return {'success': False, 'message': 'Target connection not found'}
+        
+        client = MongoDBClient(connection)
+        return client.copy_collection(database_name, collection_name, target_database, target_collection,
+                                      target_connection, copy_indexes, replace)
+        
+    except Exception as e:
+        return {'success': False, 'message': f'Error: {str(e)}'}
+
+@eel.expose
+def get_copy_job(connection_name: str, job_id: str):
+    """Status of a collection copy job"""
+    try:
+        connection = connection_manager.get_connection(connection_name)
+        
+        if not connection:
+            return {'success': False, 'message': 'Connection not found'}
+        
+        return MongoDBClient(connection).get_copy_job(job_id)
+        
+    except Exception as e:
+        return {'success': False, 'message': f'Error: {str(e)}'}
+
+@eel.expose
+@offload
+def get_index_builds(connection_name: str, database_name: str, collection_name: str):
+    """Index build jobs and server-side build progress"""
+    try:
+        connection = connection_manager.get_connection(connection_name)
+        
+        if not connection:
+            return {'success': False, 'message': 'Connection not found'}
+        
+        client = MongoDBClient(connection)
+        return client.get_index_builds(database_name, collection_name)
+        
+    except Exception as e:
+        return {'success': False, 'message': f'Error: {str(e)}'}
+
+@eel.expose
+@offload
+def drop_index(connection_name: str, database_name: str, collection_name: str, index_name: str):
+    """Drop an index"""
+    try:
+        connection = connection_manager.get_connection(connection_name)
+        
+        if not connection:
+            return {'success': False, 'message': 'Connection not found'}
+        
+        client = MongoDBClient(connection)
+        return client.drop_index(database_name, collection_name, index_name)
+        
+    except Exception as e:
+        return {'success': False, 'message': f'Error: {str(e)}'}
+
+@eel.expose
+@offload
+def run_aggregation(connection_name: str, database_name: str, collection_name: str, pipeline,
+                    max_time_ms: int = 60000, allow_disk_use: bool = True, batch_size: int = 100):
+    """Run an aggregation pipeline and return its first batch (more via fetch_cursor_batch)"""
+    try:
+        connection = connection_manager.get_connection(connection_name)
+        
+        if not connection:
+            return {'success': False, 'message': 'Connection not found'}
+        
+        client = MongoDBClient(connection)
+        return client.run_aggregation(database_name, collection_name, pipeline, max_time_ms, allow_disk_use, batch_size)
+        
+    except Exception as e:
+        return {'success': False, 'message': f'Error: {str(e)}'}
+
+
+@eel.expose
+@offload
+def explain_aggregation(connection_name: str, database_name: str, collection_name: str, pipeline,
+                        max_time_ms: int = 60000, allow_disk_use: bool = True):
+    """Per-stage timing of an aggregation pipeline"""
+    try:
+        connection = connection_manager.get_connection(connection_name)
+        
+        if not connection:
+            return {'success': False, 'message': 'Connection not found'}
+        
+        client = MongoDBClient(connection)
+        return client.explain_aggregation(database_name, collection_name, pipeline, max_time_ms, allow_disk_use)
+        
+    except Exception as e:
+        return {'success': False, 'message': f'Error: {str(e)}'}
+
+
+@eel.expose
+@offload
+def open_cursor_session(connection_name: str, database_name: str, collection_name: str,
+                        search_field: str = "", search_operator: str = "", search_value: str = "",
+                        sort_spec: list = None, allow_disk_use: bool = False, confirm_unindexed_sort: bool = False,
+                        columns: list = None, preview_length: int = 0, batch_size: int = 100,
+                        conditions: list = None, combinator: str = "and"):
+    """Open a server cursor for infinite scroll and return its first batch"""
+    try:
+        connection = connection_manager.get_connection(connection_name)
+        
+        if not connection:
+            return {'success': False, 'message': 'Connection not found'}
+        
+        client = MongoDBClient(connection)
+        return client.open_cursor_session(database_name, collection_name, search_field, search_operator, search_value,
+                                          sort_spec, allow_disk_use, confirm_unindexed_sort,
+                                          columns, preview_length, batch_size, conditions, combinator)
+        
+    except Exception as e:
+        return {'success': False, 'message': f'Error: {str(e)}'}
+
+
+@eel.expose
+@offload
+def fetch_cursor_batch(session_id: str, batch_size: int = 100):
+    """Next batch of an open cursor session"""
+    return _fetch_cursor_batch(session_id, batch_size)
+
+
+@eel.expose
+@offload
+def close_cursor_sessions(session_ids: list):
+    """Close cursor sessions of a view that is being left"""
+    return _close_cursor_sessions(session_ids)
+
+@eel.expose
+@offload
 def get_document(connection_name: str, database_name: str, collection_name: str, document_id: str):
     """Get single document by _id"""
     try:
@@ -169,6 +436,7 @@ def get_document(connection_name: str, database_name: str, collection_name: str,
         return {'success': False, 'message': f'Error: {str(e)}'}
 
 @eel.expose
+@offload
 def update_document(connection_name: str, database_name: str, collection_name: str, document_id: str, document_json_str: str):
     """Update single document"""
     try:
@@ -184,6 +452,7 @@ def update_document(connection_name: str, database_name: str, collection_name: s
 
 
 @eel.expose
+@offload
 def update_document_field(connection_name: str, database_name: str, collection_name: str, document_id: str, field_key: str, field_value_json_str: str):
     """Update single field of document"""
     try:
@@ -199,6 +468,7 @@ def update_document_field(connection_name: str, database_name: str, collection_n
 
 
 @eel.expose
+@offload
 def unset_document_field(connection_name: str, database_name: str, collection_name: str, document_id: str, field_key: str):
     """Remove single field from document"""
     try:
@@ -214,8 +484,42 @@ def unset_document_field(connection_name: str, database_name: str, collection_na
 
 
 @eel.expose
-def get_collection_fields(connection_name: str, database_name: str, collection_name: str):
-    """Get list of fields in collection"""
+@offload
+def get_collection_stats(connection_name: str, database_name: str, collection_name: str, refresh: bool = False):
+    """Get size, storage and latency stats of a collection"""
+    try:
+        connection = connection_manager.get_connection(connection_name)
+        
+        if not connection:
+            return {'success': False, 'message': 'Connection not found'}
+        
+        client = MongoDBClient(connection)
+        return client.get_collection_stats(database_name, collection_name, refresh)
+        
+    except Exception as e:
+        return {'success': False, 'message': f'Error: {str(e)}'}
+
+
+@eel.expose
+@offload
+def start_collections_stats(connection_name: str, database_name: str, collection_names: list, refresh: bool = False):
+    """Start reading stats of several collections for the collections table"""
+    try:
+        connection = connection_manager.get_connection(connection_name)
+        
+        if not connection:
+            return {'success': False, 'message': 'Connection not found'}
+        
+        client = MongoDBClient(connection)
+        return client.start_collections_stats(database_name, collection_names, refresh)
+        
+    except Exception as e:
+        return {'success': False, 'message': f'Error: {str(e)}'}
+
+
+@eel.expose
+def poll_collections_stats(connection_name: str, batch_id: str):
+    """Get collection stats that arrived since the last poll"""
     try:
         connection = connection_manager.get_connection(connection_name)
         
@@ -223,7 +527,41 @@ def get_collection_fields(connection_name: str, database_name: str, collection_n
             return {'success': False, 'message': 'Connection not found'}
         
         client = MongoDBClient(connection)
-        return client.get_collection_fields(database_name, collection_name)
+        return client.poll_collections_stats(batch_id)
+        
+    except Exception as e:
+        return {'success': False, 'message': f'Error: {str(e)}'}
+
+
+@eel.expose
+def cancel_collections_stats(connection_name: str, batch_id: str):
+    """Stop a collection stats batch the table no longer needs"""
+    try:
+        connection = connection_manager.get_connection(connection_name)
+        
+        if not connection:
+            return {'success': False, 'message': 'Connection not found'}
+        
+        client = MongoDBClient(connection)
+        return client.cancel_collections_stats(batch_id)
+        
+    except Exception as e:
+        return {'success': False, 'message': f'Error: {str(e)}'}
+
+
+@eel.expose
+@offload
+def get_collection_fields(connection_name: str, database_name: str, collection_name: str, sample_size: int = 0,
+                          refresh: bool = False):
+    """Get fields of a collection with their sampled types and presence"""
+    try:
+        connection = connection_manager.get_connection(connection_name)
+        
+        if not connection:
+            return {'success': False, 'message': 'Connection not found'}
+        
+        client = MongoDBClient(connection)
+        return client.get_collection_fields(database_name, collection_name, sample_size, refresh)
         
     except Exception as e:
         return {'success': False, 'message': f'Error: {str(e)}'}
@@ -231,6 +569,7 @@ def get_collection_fields(connection_name: str, database_name: str, collection_n
 
 
 @eel.expose
+@offload
 def create_database(connection_name: str, database_name: str, collection_name: str):
     """Create a new database wrapper"""
     try:
@@ -247,6 +586,7 @@ def create_database(connection_name: str, database_name: str, collection_name: s
 
 
 @eel.expose
+@offload
 def clear_collection(connection_name: str, database_name: str, collection_name: str, confirm_collection_name: str):
     """Clear all data in collection"""
     try:
@@ -263,6 +603,7 @@ def clear_collection(connection_name: str, database_name: str, collection_name:
 
 
 @eel.expose
+@offload
 def drop_collections(connection_name: str, database_name: str, collection_names: list):
     """Drop selected collections"""
     try:
@@ -278,6 +619,26 @@ def drop_collections(connection_name: str, database_name: str, collection_names:
         return {'success': False, 'message': f'Error: {str(e)}'}
 
 
+def _import_file(connection: dict, database_name: str, collection_name: str, file_path: str):
+    """Parse a JSON/NDJSON file and insert it into a collection"""
+    from bson import json_util
+
+    documents = []
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read().strip()
+        
+        if content.startswith('['):
+            documents = json_util.loads(content)
+        else:
+            for line in content.split('\n'):
+                line = line.strip()
+                if line:
+                    documents.append(json_util.loads(line))
+    
+    client = MongoDBClient(connection)
+    return client.import_collection(database_name, collection_name, documents)
+
+
 @eel.expose
 def import_collection(connection_name: str, database_name: str):
     """Import collection(s) from JSON file(s)"""
@@ -285,7 +646,6 @@ def import_collection(connection_name: str, database_name: str):
     import os
     import tkinter as tk
     from tkinter import filedialog
-    from bson import json_util
     
     try:
         root = tk.Tk()
@@ -314,20 +674,8 @@ def import_collection(connection_name: str, database_name: str):
             try:
                 collection_name = os.path.splitext(os.path.basename(file_path))[0]
                 
-                documents = []
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read().strip()
-                    
-                    if content.startswith('['):
-                        documents = json_util.loads(content)
-                    else:
-                        for line in content.split('\n'):
-                            line = line.strip()
-                            if line:
-                                documents.append(json_util.loads(line))
-                
-                client = MongoDBClient(connection)
-                result = client.import_collection(database_name, collection_name, documents)
+                # File parsing and insert_many both block, keep them off the event loop
+                result = run_blocking(_import_file, connection, database_name, collection_name, file_path)
                 
                 if result['success']:
                     results.append(f'{collection_name}: {result["count"]} items')
@@ -356,8 +704,9 @@ def import_collection(connection_name: str, database_name: str):
         return {'success': False, 'message': f'Error: {str(e)}'}
 
 @eel.expose
-def export_collections(connection_name: str, database_name: str, collection_names: list):
-    """Export collections to JSON files"""
+def export_collections(connection_name: str, database_name: str, collection_names: list, export_format: str = 'json',
+                       partitions: int = 0, merge_parts: bool = True, compression: str = ''):
+    """Export collections to files"""
     import tkinter as tk
     from tkinter import filedialog
     import os
@@ -384,7 +733,8 @@ def export_collections(connection_name: str, database_name: str, collection_name
             return {'success': False, 'message': 'Export cancelled'}
             
         client = MongoDBClient(connection)
-        return client.export_collections(database_name, collection_names, export_dir)
+        return run_blocking(client.export_collections, database_name, collection_names, export_dir, export_format,
+                            partitions, merge_parts, compression)
         
     except Exception as e:
         return {'success': False, 'message': f'Error: {str(e)}'}
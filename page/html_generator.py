@@ -36,6 +36,8 @@ class HTMLGenerator:
         self._write_view_file('collections.html', self._get_collections_view_content())
         self._write_view_file('data.html', self._get_data_view_content())
         self._write_view_file('editor.html', self._get_editor_view_content())
+        self._write_view_file('indexes.html', self._get_indexes_view_content())
+        self._write_view_file('aggregate.html', self._get_aggregate_view_content())
 
     def generate_all(self):
         """Generate all HTML files"""
@@ -78,6 +80,22 @@ class HTMLGenerator:
             with open(path, 'r', encoding='utf-8') as f:
                 return f.read()
         return '<!-- editor view not found -->'
+
+    def _get_indexes_view_content(self) -> str:
+        """Read views/indexes.html from file if present"""
+        path = os.path.join(self.views_dir, 'indexes.html')
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return f.read()
+        return '<!-- indexes view not found -->'
+
+    def _get_aggregate_view_content(self) -> str:
+        """Read views/aggregate.html from file if present"""
+        path = os.path.join(self.views_dir, 'aggregate.html')
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return f.read()
+        return '<!-- aggregate view not found -->'
     
     def _get_index_html_content(self) -> str:
         """Build index.html content"""
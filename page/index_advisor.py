@@ -0,0 +1,155 @@
+"""
+Index Advisor
+Read a collection's indexes and tell which query shapes they can serve.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def normalize_sort(sort_spec: Optional[List]) -> List[Tuple[str, int]]:
+    """Turn [['field', 1|-1|'asc'|'desc'], ...] from the browser into pymongo sort keys"""
+    sort_keys = []
+    for item in sort_spec or []:
+        if not item or not item[0]:
+            continue
+        field = str(item[0])
+        order = item[1] if len(item) > 1 else 1
+        if isinstance(order, str):
+            order = -1 if order.lower() in ('desc', '-1') else 1
+        sort_keys.append((field, -1 if int(order) < 0 else 1))
+    return sort_keys or [('_id', 1)]
+
+
+def equality_fields(query_filter: Dict) -> set:
+    """Top-level fields the filter pins to a single value (usable as an index prefix)"""
+    fields = set()
+    for key, value in (query_filter or {}).items():
+        if key == '$and':
+            for clause in value:
+                fields |= equality_fields(clause)
+        elif key.startswith('$'):
+            continue
+        elif not (isinstance(value, dict) and any(str(op).startswith('$') for op in value)):
+            fields.add(key)
+        elif isinstance(value, dict) and set(value) == {'$eq'}:
+            fields.add(key)
+    return fields
+
+
+# Search operators reported by field_operator_support
+SEARCH_OPERATORS = ('eq', 'ne', 'gt', 'gte', 'lt', 'lte', 'between', 'in', 'nin', 'exists',
+                    'starts_with', 'eq_ci', 'like')
+# Operators a plain ascending/descending index answers with bounded key ranges
+RANGE_OPERATORS = ('eq', 'gt', 'gte', 'lt', 'lte', 'between', 'in', 'starts_with')
+
+
+def query_collation(collation: Optional[Dict]) -> Optional[Dict]:
+    """An index's collation document as a query option (without the ICU version field)"""
+    if not collation:
+        return None
+    return {key: value for key, value in collation.items() if key != 'version'}
+
+
+def is_case_insensitive(collation: Optional[Dict]) -> bool:
+    """Strength 1 or 2 compares strings without regard to case"""
+    return bool(collation) and collation.get('locale') not in (None, 'simple') and collation.get('strength', 3) <= 2
+
+
+def plain_indexes(index_info: Dict, collation: Optional[Dict] = None) -> Dict[str, List[Tuple[str, Any]]]:
+    """
+    Indexes the planner can use for any query: partial, sparse and collated indexes are
+    left out because they only apply to matching filters or collations. With a query
+    collation, indexes built with that same collation are included too.
+    """
+    indexes = {}
+    for name, info in index_info.items():
+        if info.get('partialFilterExpression') or info.get('sparse'):
+            continue
+        index_collation = query_collation(info.get('collation'))
+        if index_collation and index_collation != collation:
+            continue
+        indexes[name] = list(info['key'])
+    return indexes
+
+
+def case_insensitive_collation(index_info: Dict, fields: List[str]) -> Optional[Dict]:
+    """Collation of a case-insensitive index led by one of fields, for eq_ci searches"""
+    for field in fields:
+        for info in index_info.values():
+            keys = list(info['key'])
+            if (keys and keys[0][0] == field and not info.get('partialFilterExpression')
+                    and is_case_insensitive(info.get('collation'))):
+                return query_collation(info['collation'])
+    return None
+
+
+def field_operator_support(index_info: Dict, field: str) -> Dict[str, Optional[str]]:
+    """
+    For each search operator, the name of an index led by field that can answer it with
+    bounded index ranges, or None when the search scans. 'like' (contains) always scans.
+    """
+    support: Dict[str, Optional[str]] = {operator: None for operator in SEARCH_OPERATORS}
+
+    def offer(operators, name):
+        for operator in operators:
+            support[operator] = support[operator] or name
+
+    for name, info in index_info.items():
+        keys = list(info['key'])
+        if not keys or keys[0][0] != field or info.get('partialFilterExpression'):
+            continue
+        kind = keys[0][1]
+        collation = info.get('collation')
+        if kind == 'hashed':
+            offer(('eq', 'in'), name)
+        elif not isinstance(kind, (int, float)):
+            continue
+        elif is_case_insensitive(collation):
+            # String predicates only use it when the query carries the same collation
+            offer(('eq_ci',), name)
+        elif collation and collation.get('locale') != 'simple':
+            continue
+        elif info.get('sparse'):
+            offer(('exists',), name)
+        else:
+            offer(RANGE_OPERATORS, name)
+    return support
+
+
+def distinct_index(index_info: Dict, field: str) -> Optional[Tuple[str, bool]]:
+    """
+    (name, unique) of a plain ascending / descending index led by field - the indexes range
+    operators are offered for. Facets hint their $group to it so the field's values are read
+    from index keys.
+    """
+    name = field_operator_support(index_info, field)['between']
+    if name is None:
+        return None
+    return name, bool(index_info[name].get('unique')) or name == '_id_'
+
+
+def find_sort_index(indexes: Dict[str, List[Tuple[str, Any]]], sort_keys: List[Tuple[str, int]],
+                    query_filter: Optional[Dict] = None) -> Optional[str]:
+    """
+    Name of an index that returns documents already in sort order, or None when the
+    server would need a blocking in-memory sort. Leading index fields pinned by an
+    equality in the filter may be skipped, and an index can be walked backwards.
+    """
+    pinned = equality_fields(query_filter or {})
+    sort_fields = {field for field, _ in sort_keys}
+    for name, keys in indexes.items():
+        remaining = list(keys)
+        while remaining and remaining[0][0] in pinned and remaining[0][0] not in sort_fields:
+            remaining.pop(0)
+        if len(remaining) < len(sort_keys):
+            continue
+        prefix = remaining[:len(sort_keys)]
+        if not all(isinstance(order, (int, float)) for _, order in prefix):
+            continue
+        forward = all(field == sort_field and int(order) == sort_order
+                      for (field, order), (sort_field, sort_order) in zip(prefix, sort_keys))
+        backward = all(field == sort_field and int(order) == -sort_order
+                       for (field, order), (sort_field, sort_order) in zip(prefix, sort_keys))
+        if forward or backward:
+            return name
+    return None
@@ -0,0 +1,90 @@
+"""
+Jobs
+Long-running server operations (index builds, ...) that run off the UI path and are polled for status.
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+JOB_WORKERS = 2
+# Finished jobs stay visible this long (seconds)
+JOB_RETENTION = 3600
+
+
+class JobManager:
+    """
+    Run jobs on a small dedicated pool, separate from background.py, so a multi-hour
+    build does not hold up short background tasks. Each job is a dict the UI can poll:
+    status is 'queued', 'running', 'done' or 'failed'.
+    """
+
+    def __init__(self, max_workers: int = JOB_WORKERS, retention: float = JOB_RETENTION):
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='khaan-job')
+        self._jobs: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, description: str, func: Callable, *args, info: Optional[Dict] = None,
+               **kwargs) -> str:
+        """Queue func(*args, **kwargs) and return the job id; info is stored on the job for filtering"""
+        self._prune()
+        job_id = uuid.uuid4().hex
+        job = {
+            'id': job_id,
+            'kind': kind,
+            'description': description,
+            'status': 'queued',
+            'created': time.time(),
+            'started': None,
+            'finished': None,
+            'result': None,
+            'error': None,
+            **(info or {}),
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+        self._executor.submit(self._run, job_id, func, args, kwargs)
+        return job_id
+
+    def _run(self, job_id: str, func: Callable, args: tuple, kwargs: Dict):
+        self._update(job_id, status='running', started=time.time())
+        try:
+            result = func(*args, **kwargs)
+            self._update(job_id, status='done', result=result, finished=time.time())
+        except Exception as e:
+            print(f"Error in job {job_id}: {e}")
+            self._update(job_id, status='failed', error=str(e), finished=time.time())
+
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list(self, kind: Optional[str] = None, **match) -> List[Dict]:
+        """Jobs of a kind whose info matches all given fields, newest first"""
+        self._prune()
+        with self._lock:
+            found = [dict(job) for job in self._jobs.values()
+                     if (kind is None or job['kind'] == kind)
+                     and all(job.get(key) == value for key, value in match.items())]
+        return sorted(found, key=lambda job: job['created'], reverse=True)
+
+    def _prune(self):
+        """Forget finished jobs older than the retention period"""
+        cutoff = time.time() - self.retention
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job['finished'] and job['finished'] < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+
+jobs = JobManager()
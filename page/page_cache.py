@@ -0,0 +1,70 @@
+"""
+Page Cache
+Small LRU of grid pages (prefetched or already shown), dropped when the collection is written.
+"""
+
+import threading
+from typing import Any, Dict, Hashable, Tuple
+
+from ttl_cache import TTLCache
+
+PAGE_CACHE_TTL = 120
+PAGE_CACHE_MAX_PAGES = 32
+
+
+class PageCache:
+    """
+    Pages keyed by (connection, database, collection) plus the request signature.
+    Each namespace has a generation number bumped on invalidation, so a prefetch that
+    started before a write cannot store its now stale page afterwards.
+    """
+
+    def __init__(self, ttl: float = PAGE_CACHE_TTL, max_pages: int = PAGE_CACHE_MAX_PAGES):
+        self._pages = TTLCache(ttl=ttl, max_entries=max_pages)
+        self._generations: Dict[Tuple, int] = {}
+        # Bumped by invalidate_prefix, which cannot enumerate namespaces it has never seen
+        self._epoch = 0
+        self._in_flight = set()
+        self._lock = threading.Lock()
+
+    def generation(self, namespace: Tuple) -> Tuple[int, int]:
+        with self._lock:
+            return self._epoch, self._generations.get(namespace, 0)
+
+    def get(self, namespace: Tuple, signature: Hashable) -> Any:
+        return self._pages.get(namespace + (signature,))
+
+    def put(self, namespace: Tuple, signature: Hashable, page: Any, generation: Tuple[int, int]):
+        with self._lock:
+            if (self._epoch, self._generations.get(namespace, 0)) != generation:
+                return
+            self._pages.set(namespace + (signature,), page)
+
+    def begin_fetch(self, namespace: Tuple, signature: Hashable) -> bool:
+        """Claim a prefetch; False when the page is cached or already being fetched"""
+        key = namespace + (signature,)
+        with self._lock:
+            if key in self._in_flight:
+                return False
+            if self._pages.get(key) is not None:
+                return False
+            self._in_flight.add(key)
+            return True
+
+    def end_fetch(self, namespace: Tuple, signature: Hashable):
+        with self._lock:
+            self._in_flight.discard(namespace + (signature,))
+
+    def invalidate(self, namespace: Tuple):
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+        self._pages.invalidate_prefix(namespace)
+
+    def invalidate_prefix(self, prefix: Tuple):
+        """Invalidate every namespace under prefix, e.g. all collections of a connection"""
+        with self._lock:
+            self._epoch += 1
+        self._pages.invalidate_prefix(prefix)
+
+
+page_cache = PageCache()
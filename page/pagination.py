@@ -0,0 +1,34 @@
+"""
+Keyset Pagination
+Opaque cursor tokens and _id range predicates used instead of skip() when paging.
+"""
+
+import base64
+from typing import Any, Dict
+from bson import json_util
+
+
+def encode_cursor_token(document_id: Any) -> str:
+    """Encode the _id of a boundary document as an opaque token for the browser"""
+    raw = json_util.dumps({'id': document_id})
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor_token(token: str) -> Any:
+    """Decode a token created by encode_cursor_token back to the BSON _id value"""
+    raw = base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8')
+    return json_util.loads(raw)['id']
+
+
+def keyset_filter(query_filter: Dict, token: str, direction: str, id_order: int = 1) -> Dict:
+    """
+    Combine the user filter with an _id range predicate after/before the token.
+    id_order is the _id sort direction of the view (1 ascending, -1 descending).
+    """
+    boundary = decode_cursor_token(token)
+    forward = (direction == 'next') == (id_order == 1)
+    range_op = '$gt' if forward else '$lt'
+    range_filter = {'_id': {range_op: boundary}}
+    if not query_filter:
+        return range_filter
+    return {'$and': [query_filter, range_filter]}
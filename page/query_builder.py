@@ -0,0 +1,247 @@
+"""
+Query Builder
+Compile typed search conditions from the data view into MongoDB filters that indexes can serve.
+"""
+
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+
+
+VALUE_TYPES = ('string', 'int', 'double', 'date', 'objectId', 'bool', 'null')
+
+# Condition operator -> MongoDB operator
+COMPARISON_OPERATORS = {
+    'eq': '$eq',
+    'ne': '$ne',
+    'gt': '$gt',
+    'gte': '$gte',
+    'lt': '$lt',
+    'lte': '$lte',
+}
+LIST_OPERATORS = {
+    'in': '$in',
+    'nin': '$nin',
+}
+# String operators that stay index-friendly: an anchored prefix regex and case-insensitive equality
+STRING_OPERATORS = ('starts_with', 'eq_ci')
+OPERATORS = tuple(COMPARISON_OPERATORS) + tuple(LIST_OPERATORS) + ('between', 'exists') + STRING_OPERATORS
+
+LOWER_BOUNDS = ('$gt', '$gte')
+UPPER_BOUNDS = ('$lt', '$lte')
+
+
+def parse_date(text: str) -> datetime:
+    """Parse 'YYYY-MM-DD' or an ISO 8601 timestamp as naive UTC, the way BSON dates are stored"""
+    if text.endswith('Z'):
+        text = text[:-1] + '+00:00'
+    parsed = datetime.fromisoformat(text)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def coerce_value(value: Any, value_type: str) -> Any:
+    """Convert a value typed in the UI to the BSON type chosen for the condition"""
+    if value_type == 'null':
+        return None
+    if value_type in ('', 'string'):
+        return '' if value is None else str(value)
+    if isinstance(value, bool) and value_type == 'bool':
+        return value
+
+    text = str(value).strip()
+    try:
+        if value_type == 'int':
+            return int(text)
+        if value_type == 'double':
+            return float(text)
+        if value_type == 'bool':
+            if text.lower() in ('true', '1', 'yes'):
+                return True
+            if text.lower() in ('false', '0', 'no'):
+                return False
+            raise ValueError(text)
+        if value_type == 'date':
+            return parse_date(text)
+        if value_type == 'objectId':
+            return ObjectId(text)
+    except (ValueError, InvalidId):
+        raise ValueError(f"'{value}' is not a valid {value_type} value")
+    raise ValueError(f"Unknown value type: {value_type}")
+
+
+def _as_list(value: Any) -> List:
+    """List values come from the UI as a JSON array or a comma-separated string"""
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    if value is None or str(value).strip() == '':
+        return []
+    return [part.strip() for part in str(value).split(',')]
+
+
+def collation_fields(conditions: Optional[List[Dict]]) -> List[str]:
+    """
+    Fields of eq_ci conditions that a case-insensitive collation could answer. Empty when
+    another condition compares strings, because a query collation applies to all of them.
+    """
+    fields = []
+    for condition in conditions or []:
+        operator = condition.get('operator') or 'eq'
+        if operator == 'eq_ci':
+            fields.append((condition.get('field') or '').strip())
+        elif operator not in ('exists', 'starts_with') and (condition.get('type') or 'string') == 'string':
+            return []
+    return fields
+
+
+def compile_condition(condition: Dict, use_collation: bool = False) -> Tuple[str, Dict]:
+    """
+    Compile one {field, operator, value, type} condition to (field, {mongo operator: value}).
+    Values are coerced to their type so numbers, dates and ObjectIds match stored values.
+    eq_ci becomes a plain $eq when the query runs with a case-insensitive collation
+    (use_collation), otherwise an anchored case-insensitive regex.
+    """
+    field = (condition.get('field') or '').strip()
+    operator = condition.get('operator') or 'eq'
+    value_type = condition.get('type') or 'string'
+    value = condition.get('value')
+
+    if not field:
+        raise ValueError('Every condition needs a field')
+    if value_type not in VALUE_TYPES:
+        raise ValueError(f"Unknown value type: {value_type}")
+
+    if operator in COMPARISON_OPERATORS:
+        return field, {COMPARISON_OPERATORS[operator]: coerce_value(value, value_type)}
+    if operator in LIST_OPERATORS:
+        values = [coerce_value(item, value_type) for item in _as_list(value)]
+        if not values:
+            raise ValueError(f"'{field}' {operator} needs at least one value")
+        return field, {LIST_OPERATORS[operator]: values}
+    if operator == 'between':
+        bounds = _as_list(value)
+        if len(bounds) != 2:
+            raise ValueError(f"'{field}' between needs two values")
+        return field, {'$gte': coerce_value(bounds[0], value_type),
+                       '$lte': coerce_value(bounds[1], value_type)}
+    if operator == 'exists':
+        exists = True if value in (None, '') else coerce_value(value, 'bool')
+        return field, {'$exists': exists}
+    if operator == 'starts_with':
+        # Anchored and escaped, so the planner turns it into a bounded index range
+        return field, {'$regex': '^' + re.escape(coerce_value(value, 'string'))}
+    if operator == 'eq_ci':
+        text = coerce_value(value, 'string')
+        if use_collation:
+            return field, {'$eq': text}
+        return field, {'$regex': '^' + re.escape(text) + '$', '$options': 'i'}
+    raise ValueError(f"Unknown operator: {operator}")
+
+
+def _comparable(a: Any, b: Any) -> bool:
+    """Whether two bound values sort by Python comparison the way MongoDB compares them"""
+    numeric = (int, float)
+    if isinstance(a, bool) or isinstance(b, bool):
+        return isinstance(a, bool) and isinstance(b, bool)
+    if isinstance(a, numeric) and isinstance(b, numeric):
+        return True
+    return type(a) is type(b) and isinstance(a, (str, datetime, ObjectId))
+
+
+def _same_value(a: Any, b: Any) -> bool:
+    """Equal and of the same type: Python has True == 1 and False == 0, BSON does not"""
+    return type(a) is type(b) and a == b
+
+
+def _tighter(operator: str, current: Tuple[str, Any], candidate: Tuple[str, Any]) -> Tuple[str, Any]:
+    """Pick the narrower of two bounds on the same side of a range"""
+    (cur_op, cur_value), (new_op, new_value) = current, candidate
+    if cur_value == new_value:
+        # $gt is narrower than $gte and $lt narrower than $lte at the same value
+        return current if cur_op in ('$gt', '$lt') else candidate
+    if operator in LOWER_BOUNDS:
+        return current if cur_value > new_value else candidate
+    return current if cur_value < new_value else candidate
+
+
+def _merge_and(compiled: List[Tuple[str, Dict]]) -> Dict:
+    """
+    AND: one predicate document per field so a compound bound like {$gte, $lt} reaches the
+    planner as a single index range. Bounds on the same side are narrowed to the tighter one;
+    anything that cannot be merged is kept in $and.
+    """
+    merged: Dict[str, Dict] = {}
+    extra: List[Dict] = []
+    for field, ops in compiled:
+        target = merged.setdefault(field, {})
+        if '$regex' in ops and '$regex' in target:
+            # $regex and $options belong together
+            extra.append({field: ops})
+            continue
+        for operator, value in ops.items():
+            side = LOWER_BOUNDS if operator in LOWER_BOUNDS else UPPER_BOUNDS if operator in UPPER_BOUNDS else None
+            existing = next((op for op in (side or (operator,)) if op in target), None)
+            if existing is None:
+                target[operator] = value
+            elif side and _comparable(target[existing], value):
+                op, bound = _tighter(operator, (existing, target.pop(existing)), (operator, value))
+                target[op] = bound
+            elif existing == operator and _same_value(target[existing], value):
+                continue
+            else:
+                extra.append({field: {operator: value}})
+
+    query_filter = {field: _predicate(ops) for field, ops in merged.items()}
+    if extra:
+        query_filter['$and'] = extra
+    return query_filter
+
+
+def _merge_or(compiled: List[Tuple[str, Dict]]) -> Dict:
+    """OR: equalities and $in lists on the same field fold into one $in (a single index scan)"""
+    in_values: Dict[str, List] = {}
+    clauses: List[Any] = []
+    for field, ops in compiled:
+        if len(ops) == 1 and ('$eq' in ops or '$in' in ops):
+            values = ops['$in'] if '$in' in ops else [ops['$eq']]
+            if field not in in_values:
+                in_values[field] = []
+                clauses.append(field)
+            for value in values:
+                if not any(_same_value(value, seen) for seen in in_values[field]):
+                    in_values[field].append(value)
+        else:
+            clauses.append({field: _predicate(ops)})
+
+    branches = []
+    for clause in clauses:
+        if isinstance(clause, str):
+            values = in_values[clause]
+            branches.append({clause: values[0] if len(values) == 1 else {'$in': values}})
+        else:
+            branches.append(clause)
+    return branches[0] if len(branches) == 1 else {'$or': branches}
+
+
+def _predicate(ops: Dict) -> Any:
+    """Plain equality is written as {field: value}, everything else as an operator document"""
+    if len(ops) == 1 and '$eq' in ops and not isinstance(ops['$eq'], dict):
+        return ops['$eq']
+    return ops
+
+
+def compile_conditions(conditions: Optional[List[Dict]], combinator: str = 'and',
+                       use_collation: bool = False) -> Dict:
+    """Compile a list of conditions joined by 'and' / 'or' into one find filter"""
+    if not conditions:
+        return {}
+    if combinator not in ('and', 'or'):
+        raise ValueError(f"Unknown combinator: {combinator}")
+    compiled = [compile_condition(condition, use_collation) for condition in conditions]
+    if combinator == 'or':
+        return _merge_or(compiled)
+    return _merge_and(compiled)
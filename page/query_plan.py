@@ -0,0 +1,140 @@
+"""
+Query Plan
+Summarize MongoDB explain output for the data view's plan panel.
+"""
+
+from typing import Dict, Iterator, List, Optional
+
+EXPLAIN_VERBOSITIES = ('queryPlanner', 'executionStats')
+
+
+def _walk(node) -> Iterator[Dict]:
+    """Yield every stage of a plan tree (classic, slot-based and sharded layouts)"""
+    if isinstance(node, list):
+        for item in node:
+            yield from _walk(item)
+        return
+    if not isinstance(node, dict):
+        return
+    if 'stage' in node:
+        yield node
+    for key in ('queryPlan', 'inputStage', 'inputStages', 'shards', 'winningPlan'):
+        if key in node:
+            yield from _walk(node[key])
+
+
+def _winning_plan(query_planner: Dict) -> Dict:
+    return query_planner.get('winningPlan', {}) if query_planner else {}
+
+
+def _query_planner(explain_output: Dict) -> Dict:
+    """queryPlanner section of a find explain, or of the $cursor stage of an aggregate explain"""
+    if 'queryPlanner' in explain_output:
+        return explain_output['queryPlanner']
+    for stage in explain_output.get('stages', []):
+        cursor = stage.get('$cursor')
+        if cursor and 'queryPlanner' in cursor:
+            return cursor['queryPlanner']
+    return {}
+
+
+def _execution_stats(explain_output: Dict) -> Optional[Dict]:
+    if 'executionStats' in explain_output:
+        return explain_output['executionStats']
+    for stage in explain_output.get('stages', []):
+        cursor = stage.get('$cursor')
+        if cursor and 'executionStats' in cursor:
+            return cursor['executionStats']
+    return None
+
+
+def summarize_explain(explain_output: Dict) -> Dict:
+    """
+    Reduce an explain result to what the plan panel shows: the winning plan's stages,
+    the indexes it uses, whether it scans the whole collection and (for executionStats)
+    keys / documents examined.
+    """
+    query_planner = _query_planner(explain_output)
+    stages = list(_walk(_winning_plan(query_planner)))
+    index_names: List[str] = []
+    for stage in stages:
+        name = stage.get('indexName')
+        if name and name not in index_names:
+            index_names.append(name)
+
+    summary = {
+        'stages': [stage['stage'] for stage in stages],
+        'index_names': index_names,
+        'collscan': any(stage['stage'] == 'COLLSCAN' for stage in stages),
+        'in_memory_sort': any(stage['stage'] in ('SORT', 'SORT_KEY_GENERATOR') for stage in stages),
+        'rejected_plans': len(query_planner.get('rejectedPlans', [])),
+        'execution': None,
+    }
+
+    stats = _execution_stats(explain_output)
+    if stats:
+        summary['execution'] = {
+            'n_returned': stats.get('nReturned', 0),
+            'keys_examined': stats.get('totalKeysExamined', 0),
+            'docs_examined': stats.get('totalDocsExamined', 0),
+            'time_ms': stats.get('executionTimeMillis', 0),
+        }
+    return summary
+
+
+def _stage_timings(stages: List[Dict]) -> List[Dict]:
+    """
+    Per-stage rows from cumulative executionTimeMillisEstimate values (each stage's
+    estimate includes the stages feeding it, so the difference is its own share).
+    """
+    rows = []
+    previous = 0
+    for stage in stages:
+        cumulative = stage.get('time_ms')
+        own = None if cumulative is None else max(0, cumulative - previous)
+        if cumulative is not None:
+            previous = cumulative
+        rows.append(dict(stage, own_time_ms=own))
+    return rows
+
+
+def _aggregate_stages(output: Dict) -> List[Dict]:
+    """Stages of one (shard's) aggregate explain in the order documents flow through them"""
+    stages = []
+    for stage in output.get('stages', []):
+        name = next((key for key in stage if key.startswith('$')), '?')
+        stages.append({
+            'stage': name,
+            'time_ms': stage.get('executionTimeMillisEstimate'),
+            'n_returned': stage.get('nReturned'),
+        })
+    if not stages:
+        # Pipeline pushed down entirely: the query plan's stages, leaves first
+        stats = output.get('executionStats', {})
+        for stage in reversed(list(_walk(stats.get('executionStages', {})))):
+            stages.append({
+                'stage': stage['stage'],
+                'time_ms': stage.get('executionTimeMillisEstimate'),
+                'n_returned': stage.get('nReturned'),
+            })
+    return _stage_timings(stages)
+
+
+def summarize_aggregate_explain(explain_output: Dict) -> Dict:
+    """
+    Per-stage timing of an aggregate explain (executionStats). The $cursor stage stands for
+    the query layer (match / sort / projection pushed down to find); a sharded collection
+    reports the stages of every shard.
+    """
+    shards = explain_output.get('shards') or {}
+    if shards:
+        stages = [dict(stage, shard=name) for name, output in shards.items() for stage in _aggregate_stages(output)]
+        first = next(iter(shards.values()))
+    else:
+        stages = _aggregate_stages(explain_output)
+        first = explain_output
+    return {
+        'stages': stages,
+        'query': summarize_explain(first),
+        'shards': len(shards),
+    }
@@ -0,0 +1,189 @@
+"""
+Schema Inference
+Infer a collection's fields (nested dot-paths), value types and presence from a random sample.
+"""
+
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from grid_format import bson_type
+from ttl_cache import TTLCache
+
+SCHEMA_SAMPLE_SIZE = 1000
+# A cached schema is served as-is for this long, then refreshed incrementally
+SCHEMA_CACHE_TTL = 600
+# After this long the statistics are thrown away and the collection is sampled again
+SCHEMA_RETENTION = 6 * 3600
+# Documents read by an incremental refresh: this many newest by _id plus this many random ones
+SCHEMA_REFRESH_SIZE = 200
+# Per-collection inference locks kept before idle ones are pruned
+MAX_LOCKS = 256
+MAX_DEPTH = 6
+# Array elements inspected for fields of embedded documents
+ARRAY_SCAN_LIMIT = 20
+MAX_FIELDS = 1000
+
+
+class SchemaAccumulator:
+    """Per-path statistics that more sampled documents can be folded into"""
+
+    def __init__(self):
+        self.documents = 0
+        self.fields: Dict[str, Dict] = {}
+
+    def add(self, document: Dict):
+        self.documents += 1
+        self._walk(document, '', 0, set())
+
+    def _walk(self, document: Dict, prefix: str, depth: int, seen: set):
+        for key, value in document.items():
+            path = prefix + str(key)
+            self._record(path, value, seen)
+            if depth >= MAX_DEPTH:
+                continue
+            if isinstance(value, dict):
+                self._walk(value, path + '.', depth + 1, seen)
+            elif isinstance(value, list):
+                # Dot notation reaches into arrays of embedded documents
+                for item in value[:ARRAY_SCAN_LIMIT]:
+                    if isinstance(item, dict):
+                        self._walk(item, path + '.', depth + 1, seen)
+
+    def _record(self, path: str, value: Any, seen: set):
+        field = self.fields.get(path)
+        if field is None:
+            if len(self.fields) >= MAX_FIELDS:
+                return
+            field = self.fields[path] = {'count': 0, 'types': Counter()}
+        field['types'][bson_type(value)] += 1
+        # Presence counts documents, not occurrences inside arrays
+        if path not in seen:
+            seen.add(path)
+            field['count'] += 1
+
+    def merged(self, *others: 'SchemaAccumulator') -> 'SchemaAccumulator':
+        """A new accumulator holding the statistics of this one and others"""
+        result = SchemaAccumulator()
+        for accumulator in (self,) + others:
+            result.documents += accumulator.documents
+            for path, field in accumulator.fields.items():
+                target = result.fields.get(path)
+                if target is None:
+                    if len(result.fields) >= MAX_FIELDS:
+                        continue
+                    target = result.fields[path] = {'count': 0, 'types': Counter()}
+                target['count'] += field['count']
+                target['types'].update(field['types'])
+        return result
+
+    def summary(self) -> List[Dict]:
+        """Fields with presence ratio and type histogram, _id first then by path"""
+        documents = max(self.documents, 1)
+        return [
+            {
+                'path': path,
+                'presence': round(field['count'] / documents, 4),
+                'count': field['count'],
+                'types': dict(field['types'].most_common()),
+            }
+            for path, field in sorted(self.fields.items(), key=lambda item: (item[0] != '_id', item[0]))
+        ]
+
+
+class SchemaInference:
+    """Sampled schemas cached per (connection, database, collection)"""
+
+    def __init__(self, sample_size: int = SCHEMA_SAMPLE_SIZE, ttl: float = SCHEMA_CACHE_TTL):
+        self.sample_size = sample_size
+        self.ttl = ttl
+        self._cache = TTLCache(ttl=SCHEMA_RETENTION, max_entries=256)
+        self._locks: Dict[tuple, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock_for(self, key: tuple) -> threading.Lock:
+        """One inference per collection at a time; concurrent callers share its result"""
+        with self._locks_guard:
+            if key not in self._locks and len(self._locks) >= MAX_LOCKS:
+                self._prune_locks(lambda _: True)
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _prune_locks(self, matches):
+        """Drop the idle locks whose key matches; callers hold _locks_guard"""
+        for key in [key for key, lock in self._locks.items() if matches(key) and not lock.locked()]:
+            del self._locks[key]
+
+    def infer(self, key: tuple, collection, sample_size: Optional[int] = None, refresh: bool = False) -> Dict:
+        """
+        Schema of a collection. A cache entry younger than ttl is returned as-is; an older one
+        is refreshed incrementally (newest documents by _id plus a small random sample);
+        a missing entry, a different sample size, a full sample older than SCHEMA_RETENTION,
+        more new documents than the sample size or refresh=True runs a full $sample.
+        """
+        size = sample_size or self.sample_size
+        with self._lock_for(key):
+            entry = self._cache.get_entry(key)
+            # Incremental refreshes re-store the entry, so retention counts from the last full sample
+            if entry and (refresh or entry[1]['sample_size'] != size
+                          or time.monotonic() - entry[1]['sampled_at'] > SCHEMA_RETENTION
+                          or entry[1]['newest'].documents >= size):
+                entry = None
+            if entry:
+                age, cached = entry
+                if age <= self.ttl:
+                    return self._result(cached, age, 'cached')
+                self._refresh(collection, cached)
+                self._cache.set(key, cached)
+                return self._result(cached, 0, 'incremental')
+
+            # Taken before the sample, so documents inserted meanwhile are picked up as newest
+            last = list(collection.find({}, {'_id': 1}).sort('_id', -1).limit(1))
+            accumulator = SchemaAccumulator()
+            for document in collection.aggregate([{'$sample': {'size': size}}], allowDiskUse=True):
+                accumulator.add(document)
+            cached = {
+                'sample': accumulator,
+                # Documents inserted after the sample, read once each in _id order
+                'newest': SchemaAccumulator(),
+                # The random sample of the last refresh, replaced by the next one
+                'window': SchemaAccumulator(),
+                'max_id': last[0]['_id'] if last else None,
+                'sample_size': size,
+                'sampled_at': time.monotonic(),
+            }
+            self._cache.set(key, cached)
+            return self._result(cached, 0, 'sampled')
+
+    def _refresh(self, collection, cached: Dict):
+        """
+        Fold the documents added since the last pass into the statistics and replace the
+        random window with a new sample, so no document is counted twice.
+        """
+        query = {} if cached['max_id'] is None else {'_id': {'$gt': cached['max_id']}}
+        newest = collection.find(query).sort('_id', 1).limit(SCHEMA_REFRESH_SIZE)
+        for document in newest:
+            cached['newest'].add(document)
+            cached['max_id'] = document['_id']
+        window = SchemaAccumulator()
+        for document in collection.aggregate([{'$sample': {'size': SCHEMA_REFRESH_SIZE}}]):
+            window.add(document)
+        cached['window'] = window
+
+    def invalidate(self, key_prefix: tuple):
+        self._cache.invalidate_prefix(key_prefix)
+        size = len(key_prefix)
+        with self._locks_guard:
+            self._prune_locks(lambda key: key[:size] == key_prefix)
+
+    def _result(self, cached: Dict, age: float, source: str) -> Dict:
+        accumulator = cached['sample'].merged(cached['newest'], cached['window'])
+        return {
+            'schema': accumulator.summary(),
+            'sampled': accumulator.documents,
+            'age': int(age),
+            'source': source,
+        }
+
+
+schema_inference = SchemaInference()
@@ -0,0 +1,35 @@
+from client_registry import MongoClientRegistry
+
+CONNECTION = {'name': 'local'}
+# MongoClient connects lazily, so nothing is contacted here
+URI = 'mongodb://127.0.0.1:1/?connect=false'
+
+
+def test_idle_client_is_evicted():
+    registry = MongoClientRegistry(idle_timeout=-1)
+    client = registry.get_client(CONNECTION, URI)
+    registry.evict_idle()
+    assert registry.get_client(CONNECTION, URI) is not client
+    registry.close_all()
+
+
+def test_pinned_client_survives_until_released():
+    registry = MongoClientRegistry(idle_timeout=-1)
+    client = registry.get_client(CONNECTION, URI)
+    release = registry.pin('local')
+    registry.evict_idle()
+    assert registry.get_client(CONNECTION, URI) is client
+    release()
+    release()
+    registry.evict_idle()
+    assert registry.get_client(CONNECTION, URI) is not client
+    registry.close_all()
+
+
+def test_pin_before_the_client_exists_protects_it():
+    registry = MongoClientRegistry(idle_timeout=-1)
+    with registry.in_use('local'):
+        client = registry.get_client(CONNECTION, URI)
+        registry.evict_idle()
+        assert registry.get_client(CONNECTION, URI) is client
+    registry.close_all()
@@ -0,0 +1,32 @@
+from connection_health import ConnectionHealth
+
+
+class FakeAdmin:
+    def __init__(self, client):
+        self.client = client
+
+    def command(self, name):
+        self.client.pings += 1
+        return {'ok': 1}
+
+
+class FakeClient:
+    def __init__(self):
+        self.pings = 0
+        self.admin = FakeAdmin(self)
+
+
+def test_fresh_result_skips_the_ping():
+    health = ConnectionHealth()
+    client = FakeClient()
+    assert health.check('local', client)['ok']
+    assert health.check('local', client)['ok']
+    assert client.pings == 1
+
+
+def test_result_of_a_collected_client_is_not_reused():
+    health = ConnectionHealth()
+    health.check('local', FakeClient())
+    replacement = FakeClient()
+    health.check('local', replacement)
+    assert replacement.pings == 1
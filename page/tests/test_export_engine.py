@@ -0,0 +1,98 @@
+import datetime
+import io
+
+import bson
+import pytest
+from bson import Decimal128, ObjectId, json_util
+
+from export_engine import (JsonArrayWriter, _id_type_alias, csv_columns, merge_parts, partition_filters,
+                           raw_document_count)
+
+DOCUMENTS = [
+    {'_id': ObjectId('64b7f0c2a1b2c3d4e5f60718'), 'name': 'Ada', 'tags': ['a', 'b'], 'empty': {}},
+    {'_id': 2, 'nested': {'list': [], 'deep': {'x': None}}, 'price': Decimal128('9.99')},
+    {'_id': 'käse', 'when': datetime.datetime(2023, 7, 19, 12, 30), 'text': 'line\nbreak "quoted"'},
+]
+
+
+def _json_array(documents):
+    stream = io.StringIO()
+    writer = JsonArrayWriter(stream)
+    writer.begin()
+    for document in documents:
+        writer.write(document)
+    writer.end()
+    return stream.getvalue()
+
+
+@pytest.mark.parametrize('documents', [[], DOCUMENTS[:1], DOCUMENTS])
+def test_json_array_matches_dumps(documents):
+    assert _json_array(documents) == json_util.dumps(documents, indent=4, ensure_ascii=False)
+
+
+def test_merged_json_fragments_match_dumps(tmp_path):
+    parts = [DOCUMENTS[:2], [], DOCUMENTS[2:]]
+    paths = []
+    for number, documents in enumerate(parts):
+        path = tmp_path / f'part{number}.json'
+        with open(path, 'w', encoding='utf-8') as stream:
+            writer = JsonArrayWriter(stream)
+            for document in documents:
+                writer.write(document)
+        paths.append(str(path))
+    target = tmp_path / 'merged.json'
+    merge_parts(paths, [len(documents) for documents in parts], str(target), 'json')
+    assert target.read_text(encoding='utf-8') == json_util.dumps(DOCUMENTS, indent=4, ensure_ascii=False)
+
+
+def _matches(query, document_id):
+    """Just enough of the server's matching for the filters partition_filters builds"""
+    condition = query.get('_id')
+    if condition is None:
+        return True
+    if '$not' in condition:
+        return _id_type_alias(document_id) != condition['$not']['$type']
+    # Range operators only compare values within one type bracket
+    bound = condition.get('$gte', condition.get('$lt'))
+    if _id_type_alias(document_id) != _id_type_alias(bound):
+        return False
+    if '$gte' in condition and not document_id >= condition['$gte']:
+        return False
+    return '$lt' not in condition or document_id < condition['$lt']
+
+
+@pytest.mark.parametrize('boundaries, ids', [
+    ([10, 20, 30], [-5, 0, 9.5, 10, 15, 20, 29, 30, 31, 2 ** 40, 'ten', ObjectId(), None, 1.5]),
+    (['g', 'p'], ['', 'a', 'g', 'h', 'p', 'zzz', 7, datetime.datetime(2020, 1, 1)]),
+    ([ObjectId('64b7f0c2a1b2c3d4e5f60718')],
+     [ObjectId('000000000000000000000000'), ObjectId('64b7f0c2a1b2c3d4e5f60718'), ObjectId(), 'x', 3]),
+])
+def test_partition_filters_cover_every_id_once(boundaries, ids):
+    filters = partition_filters(boundaries)
+    assert len(filters) == len(boundaries) + 2
+    for document_id in ids:
+        assert sum(_matches(query, document_id) for query in filters) == 1, document_id
+
+
+def test_partition_filters_without_boundaries_read_everything():
+    assert partition_filters([]) == [{}]
+
+
+def test_raw_document_count():
+    data = b''.join(bson.encode(document) for document in DOCUMENTS)
+    assert raw_document_count(data) == len(DOCUMENTS)
+    assert raw_document_count(b'') == 0
+
+
+def test_csv_columns_flatten_objects_and_keep_arrays():
+    schema = [
+        {'path': '_id', 'types': ['objectId']},
+        {'path': 'address', 'types': ['object']},
+        {'path': 'address.city', 'types': ['string']},
+        {'path': 'items', 'types': ['array']},
+        {'path': 'items.sku', 'types': ['string']},
+        {'path': 'meta', 'types': ['object', 'string']},
+        {'path': 'meta.source', 'types': ['string']},
+    ]
+    assert csv_columns(schema) == ['_id', 'address.city', 'items', 'meta', 'meta.source']
+    assert csv_columns([]) == ['_id']
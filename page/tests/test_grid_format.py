@@ -0,0 +1,19 @@
+from grid_format import build_preview_stages
+
+
+def test_no_stages_without_columns_or_preview():
+    assert build_preview_stages([], 0) == []
+
+
+def test_columns_project_top_level_fields_and_id():
+    stages = build_preview_stages(['name', 'a.b', '$x', ''], 0)
+    assert stages == [{'$project': {'_id': 1, 'name': 1}}]
+
+
+def test_preview_leaves_id_untouched():
+    root = build_preview_stages(None, 50)[0]['$replaceRoot']['newRoot']
+    merged_id, previewed = root['$mergeObjects']
+    assert merged_id == {'_id': '$_id'}
+    fields = previewed['$arrayToObject']['$map']['input']['$filter']
+    assert fields['input'] == {'$objectToArray': '$$ROOT'}
+    assert fields['cond'] == {'$ne': ['$$this.k', '_id']}
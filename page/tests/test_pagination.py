@@ -0,0 +1,42 @@
+import datetime
+
+import pytest
+from bson import ObjectId
+
+from pagination import decode_cursor_token, encode_cursor_token, keyset_filter
+
+
+@pytest.mark.parametrize('document_id', [
+    ObjectId('64b7f0c2a1b2c3d4e5f60718'),
+    'user/42?a=b&c',
+    42,
+    2 ** 40,
+    datetime.datetime(2023, 7, 19, 12, 30, 15, 123000),
+    {'tenant': 1, 'seq': 7},
+])
+def test_token_round_trip(document_id):
+    token = encode_cursor_token(document_id)
+    decoded = decode_cursor_token(token)
+    assert decoded == document_id
+    assert type(decoded) is type(document_id)
+
+
+def test_token_is_url_safe():
+    token = encode_cursor_token('??>>~~' * 10)
+    assert set(token) <= set('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_=')
+
+
+def test_keyset_filter_direction_follows_id_order():
+    token = encode_cursor_token(5)
+    assert keyset_filter({}, token, 'next') == {'_id': {'$gt': 5}}
+    assert keyset_filter({}, token, 'prev') == {'_id': {'$lt': 5}}
+    assert keyset_filter({}, token, 'next', id_order=-1) == {'_id': {'$lt': 5}}
+    assert keyset_filter({}, token, 'prev', id_order=-1) == {'_id': {'$gt': 5}}
+
+
+def test_keyset_filter_keeps_user_filter():
+    boundary = ObjectId('64b7f0c2a1b2c3d4e5f60718')
+    query = {'status': 'active'}
+    combined = keyset_filter(query, encode_cursor_token(boundary), 'next')
+    assert combined == {'$and': [{'status': 'active'}, {'_id': {'$gt': boundary}}]}
+    assert query == {'status': 'active'}
@@ -0,0 +1,86 @@
+from datetime import datetime
+
+import pytest
+from bson.objectid import ObjectId
+
+from query_builder import coerce_value, collation_fields, compile_condition, compile_conditions
+
+
+def condition(field, operator, value, value_type='string'):
+    return {'field': field, 'operator': operator, 'value': value, 'type': value_type}
+
+
+def test_coerce_value_types():
+    assert coerce_value('42', 'int') == 42
+    assert coerce_value('1.5', 'double') == 1.5
+    assert coerce_value('yes', 'bool') is True
+    assert coerce_value('2024-01-02T03:04:05Z', 'date') == datetime(2024, 1, 2, 3, 4, 5)
+    assert coerce_value('643e5a4db81f338a5c0cf3aa', 'objectId') == ObjectId('643e5a4db81f338a5c0cf3aa')
+    assert coerce_value('anything', 'null') is None
+    with pytest.raises(ValueError):
+        coerce_value('abc', 'int')
+
+
+def test_compile_condition_operators():
+    assert compile_condition(condition('age', 'gte', '18', 'int')) == ('age', {'$gte': 18})
+    assert compile_condition(condition('tag', 'in', 'a, b')) == ('tag', {'$in': ['a', 'b']})
+    assert compile_condition(condition('n', 'between', [1, 5], 'int')) == ('n', {'$gte': 1, '$lte': 5})
+    assert compile_condition(condition('f', 'exists', '')) == ('f', {'$exists': True})
+    assert compile_condition(condition('name', 'starts_with', 'a.b')) == ('name', {'$regex': r'^a\.b'})
+    assert compile_condition(condition('name', 'eq_ci', 'Bob')) == ('name', {'$regex': '^Bob$', '$options': 'i'})
+    assert compile_condition(condition('name', 'eq_ci', 'Bob'), use_collation=True) == ('name', {'$eq': 'Bob'})
+
+
+def test_compile_condition_rejects_bad_input():
+    with pytest.raises(ValueError):
+        compile_condition(condition('', 'eq', 'x'))
+    with pytest.raises(ValueError):
+        compile_condition(condition('x', 'between', [1], 'int'))
+    with pytest.raises(ValueError):
+        compile_condition(condition('x', 'nope', 'x'))
+
+
+def test_and_merges_range_on_one_field():
+    query = compile_conditions([condition('n', 'gte', '1', 'int'), condition('n', 'lt', '10', 'int')])
+    assert query == {'n': {'$gte': 1, '$lt': 10}}
+
+
+def test_and_keeps_tighter_bound():
+    query = compile_conditions([condition('n', 'gt', '1', 'int'), condition('n', 'gt', '5', 'int'),
+                                condition('n', 'gte', '5', 'int')])
+    assert query == {'n': {'$gt': 5}}
+
+
+def test_and_keeps_incomparable_bounds():
+    query = compile_conditions([condition('n', 'gt', '1', 'int'), condition('n', 'gt', 'a')])
+    assert query == {'n': {'$gt': 1}, '$and': [{'n': {'$gt': 'a'}}]}
+
+
+def test_and_drops_only_identical_equality():
+    same = compile_conditions([condition('x', 'eq', '1', 'int'), condition('x', 'eq', '1', 'int')])
+    assert same == {'x': 1}
+    # True == 1 in Python, but they are different BSON values
+    mixed = compile_conditions([condition('x', 'eq', '1', 'int'), condition('x', 'eq', 'true', 'bool')])
+    assert mixed == {'x': 1, '$and': [{'x': {'$eq': True}}]}
+
+
+def test_or_folds_equalities_into_in():
+    query = compile_conditions([condition('x', 'eq', 'a'), condition('x', 'in', 'b, a'),
+                                condition('y', 'gt', '3', 'int')], 'or')
+    assert query == {'$or': [{'x': {'$in': ['a', 'b']}}, {'y': {'$gt': 3}}]}
+
+
+def test_or_keeps_values_of_different_types():
+    query = compile_conditions([condition('x', 'eq', '1', 'int'), condition('x', 'eq', 'true', 'bool'),
+                                condition('x', 'eq', '0', 'int'), condition('x', 'eq', 'false', 'bool')], 'or')
+    assert query == {'x': {'$in': [1, True, 0, False]}}
+
+
+def test_or_single_equality_is_plain():
+    assert compile_conditions([condition('x', 'eq', 'a'), condition('x', 'eq', 'a')], 'or') == {'x': 'a'}
+
+
+def test_collation_fields():
+    assert collation_fields([condition('name', 'eq_ci', 'a'), condition('n', 'gt', '1', 'int')]) == ['name']
+    # Another string comparison would be affected by the collation too
+    assert collation_fields([condition('name', 'eq_ci', 'a'), condition('city', 'eq', 'x')]) == []
@@ -0,0 +1,29 @@
+from schema_inference import SchemaAccumulator, SchemaInference
+
+
+def _accumulator(*documents):
+    accumulator = SchemaAccumulator()
+    for document in documents:
+        accumulator.add(document)
+    return accumulator
+
+
+def test_merged_adds_up_without_changing_the_parts():
+    sample = _accumulator({'_id': 1, 'a': 1}, {'_id': 2, 'a': 'x'})
+    window = _accumulator({'_id': 3, 'b': [{'c': 1}, {'c': 2}]})
+    merged = sample.merged(window)
+    assert merged.documents == 3
+    schema = {field['path']: field for field in merged.summary()}
+    assert schema['a']['types'] == {'int': 1, 'string': 1}
+    assert schema['b.c']['count'] == 1
+    assert sample.documents == 2 and 'b' not in sample.fields
+
+
+def test_invalidate_drops_idle_locks_of_the_prefix():
+    inference = SchemaInference()
+    inference._lock_for(('conn', 'db', 'a'))
+    inference._lock_for(('other', 'db', 'a'))
+    held = inference._lock_for(('conn', 'db', 'b'))
+    with held:
+        inference.invalidate(('conn',))
+        assert set(inference._locks) == {('other', 'db', 'a'), ('conn', 'db', 'b')}
@@ -0,0 +1,62 @@
+"""
+TTL Cache
+Small thread-safe cache with per-entry expiry, keyed by tuples.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after ttl seconds"""
+
+    def __init__(self, ttl: float, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value, or default when missing or expired"""
+        entry = self.get_entry(key)
+        return default if entry is None else entry[1]
+
+    def get_entry(self, key: Hashable) -> Optional[Tuple[float, Any]]:
+        """Return (age_seconds, value) for a live entry, else None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            age = time.monotonic() - stored_at
+            if age > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return age, value
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_prefix(self, prefix: Tuple):
+        """Drop every tuple key that starts with prefix, e.g. (connection, db, collection)"""
+        size = len(prefix)
+        with self._lock:
+            stale = [key for key in self._entries
+                     if isinstance(key, tuple) and key[:size] == prefix]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()